@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+Inference benchmark for Gandiva.
+
+This loads every skill from `data/SkillPlugins` of this source tree, with the
+system portal replaced by one that gives canned responses, so no network is
+used. A query corpus is generated from the patterns of every registered intent
+and from the example queries of the skills. Every query is then run through
+`InferenceEngine.infer()` to measure throughput and latency percentiles, and
+to check whether the expected handler answered it (shortlist accuracy).
+
+Usage:
+  python3 benchmarks/inference_benchmark.py --output results.json
+  python3 benchmarks/inference_benchmark.py --compare results.json
+
+The skills and caches are set up in a temporary folder, so this doesn't touch
+the installed app. The NLTK data of the installed app is reused.
+"""
+
+# Base imports
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_ID = "com.github.watsonprojects.gandiva"
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Words used to fill in intent variables, by variable name and then by tag
+VARIABLE_WORDS = {
+  "subject": "saturn",
+  "name": "firefox",
+  "subname": "browser",
+  "keyword": "wallpaper",
+  "category": "music",
+  "library": "music"
+}
+TAG_WORDS = {
+  "JJ": "nice",
+  "RB": "nicely",
+  "VB": "do"
+}
+
+# Canned responses of the web APIs used by the skills
+CANNED_RESPONSES = {
+  "wikipedia.org": {
+    "query": {
+      "search": [
+        { "title": "Saturn", "snippet": "Saturn is the sixth planet" },
+        { "title": "Saturn (mythology)", "snippet": "Saturn was a god" }
+      ]
+    }
+  },
+  "api.duckduckgo.com": {
+    "Definition": "",
+    "Abstract": "Saturn is the sixth planet from the Sun",
+    "Image": None
+  },
+  "openweathermap.org": {
+    "name": "Kolkata",
+    "weather": [{ "icon": "01d", "description": "clear sky" }],
+    "main": { "temp": 300.15, "humidity": 60 },
+    "wind": { "speed": 3.5 }
+  }
+}
+
+
+def setup_environment(nltk_data:str):
+  """
+  Make the gandiva package importable from this source tree, and keep all
+  the files the app writes in a temporary folder.
+  """
+  work_dir = tempfile.mkdtemp(prefix="gandiva-benchmark-")
+  os.environ["XDG_DATA_HOME"] = os.path.join(work_dir, "data")
+  os.environ["XDG_CACHE_HOME"] = os.path.join(work_dir, "cache")
+  os.makedirs(os.environ["XDG_DATA_HOME"])
+  os.makedirs(os.environ["XDG_CACHE_HOME"])
+
+  # Same layout as the installed app (see src/gandiva.in)
+  os.symlink(os.path.join(REPO_DIR, "src"), os.path.join(work_dir, "gandiva"))
+  application_path = os.path.join(work_dir, "gandiva")
+  sys.path.insert(0, work_dir)
+  sys.path.insert(1, os.path.join(application_path, "utils"))
+  sys.path.insert(1, application_path)
+  sys.path.insert(1, os.path.join(application_path, "shell"))
+  sys.path.insert(1, os.path.join(application_path, "core"))
+
+  #pylint: disable=import-outside-toplevel
+  from config import constants
+  constants.init(APP_ID, REPO_DIR, "benchmark")
+
+  import nltk
+  nltk.data.path.insert(0, nltk_data)
+
+  return work_dir
+
+
+def make_canned_portal():
+  """
+  Make a system portal that answers from `CANNED_RESPONSES`.
+  """
+  #pylint: disable=import-outside-toplevel
+  from system_portal import SystemPortal
+
+  class CannedResponse():
+    def __init__(self, data):
+      self.data = data
+      # Images are skipped by the skills when they look like a GIF
+      self.content = b"GIF"
+
+    def json(self):
+      return self.data
+
+  class CannedPortal(SystemPortal):
+    def http_get(self, url:str, params, auth=None):
+      for (domain, data) in CANNED_RESPONSES.items():
+        if domain in url:
+          return CannedResponse(data)
+      return CannedResponse({})
+
+    def open_uri(self, URI:str):
+      return True
+
+    def get_location(self):
+      return [22.57, 88.36]
+
+  return CannedPortal
+
+
+def expand_pattern(pattern:str, limit:int, rng:random.Random):
+  """
+  Get up to `limit` queries that an intent pattern should match.
+  """
+  choices = []
+  for token in pattern.split(" "):
+    if re.search(r"^\[.*\]$", token) is not None:
+      choices += [token[1:-1].split(",")]
+    elif re.search(r"^{.*}$", token) is not None:
+      sub_tokens = token[1:-1].split(",")
+      word = VARIABLE_WORDS.get(sub_tokens[0])
+      if word is None:
+        word = TAG_WORDS.get(sub_tokens[1] if len(sub_tokens) > 1 else "",
+          "saturn")
+      choices += [[word]]
+    else:
+      choices += [[token]]
+
+  sentences = [" ".join(words) for words in itertools.product(*choices)]
+  if len(sentences) > limit:
+    sentences = rng.sample(sentences, limit)
+  return sentences
+
+
+def build_corpus(registrations, per_pattern:int, seed:int):
+  """
+  Get a list of `(query, expected handler)` pairs from the registered intents
+  and example queries.
+  """
+  rng = random.Random(seed)
+  corpus = []
+  for (handler_name, intent, example) in registrations:
+    if intent is not None:
+      for pattern in intent.patterns:
+        for query in expand_pattern(pattern, per_pattern, rng):
+          corpus += [(query, handler_name)]
+    if example != "":
+      query = "".join([c for c in example.lower() \
+        if c.isalnum() or c in " '"]).strip()
+      corpus += [(query, handler_name)]
+
+  return corpus
+
+
+def percentile(samples, p:float) -> float:
+  samples = sorted(samples)
+  index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+  return samples[index]
+
+
+def run(args):
+  work_dir = setup_environment(args.nltk_data)
+
+  #pylint: disable=import-outside-toplevel
+  import skill_backend
+  skill_backend.SystemPortal = make_canned_portal()
+  from inference_engine import InferenceEngine
+
+  # Note down which handler every intent belongs to
+  registrations = []
+  register_intent = skill_backend.SkillBackend.register_intent
+  def recording_register_intent(self, intent_handler_callback, intent, name,
+    example, fallback, *rest, **kwargs):
+    registrations.append((intent_handler_callback.__module__ + "." \
+      + intent_handler_callback.__name__, intent, example))
+    return register_intent(self, intent_handler_callback, intent, name,
+      example, fallback, *rest, **kwargs)
+  skill_backend.SkillBackend.register_intent = recording_register_intent
+
+  log = io.StringIO()
+  with contextlib.redirect_stdout(log):
+    engine = InferenceEngine(speculative=args.speculative,
+      confidence_threshold=args.confidence_threshold)
+    setup_start = time.perf_counter()
+    engine.update_skills()
+    setup_time = time.perf_counter() - setup_start
+
+  corpus = build_corpus(registrations, args.per_pattern, args.seed)
+
+  latencies = []
+  misrouted = {}
+  with contextlib.redirect_stdout(log):
+    # Warm up the tagger and the skills
+    for (query, _) in corpus[:10]:
+      engine.infer(query)
+    engine.clear_cache()
+
+    total_start = time.perf_counter()
+    for _ in range(args.rounds):
+      for (query, expected) in corpus:
+        engine.clear_cache()
+        start = time.perf_counter()
+        engine.infer(query)
+        latencies += [(time.perf_counter() - start) * 1000]
+        handler = engine.get_last_handler()
+        if handler != expected:
+          misrouted[query] = { "expected": expected, "answered_by": handler,
+            "confidence": engine.get_last_confidence() }
+    total_time = time.perf_counter() - total_start
+
+  shutil.rmtree(work_dir, ignore_errors=True)
+
+  commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+    cwd=REPO_DIR, capture_output=True, text=True, check=False).stdout.strip()
+
+  return {
+    "commit": commit,
+    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    "config": {
+      "rounds": args.rounds,
+      "per_pattern": args.per_pattern,
+      "seed": args.seed,
+      "speculative": args.speculative,
+      "confidence_threshold": args.confidence_threshold
+    },
+    "registrations": len(registrations),
+    "queries": len(corpus),
+    "skill_setup_s": setup_time,
+    "throughput_qps": len(latencies) / total_time,
+    "latency_ms": {
+      "mean": sum(latencies) / len(latencies),
+      "p50": percentile(latencies, 50),
+      "p95": percentile(latencies, 95),
+      "p99": percentile(latencies, 99)
+    },
+    "accuracy": 1 - len(misrouted) / len(corpus),
+    "misrouted": misrouted,
+    "stats": engine.get_stats().get_summary()
+  }
+
+
+def print_results(results, baseline=None):
+  rows = [
+    ("queries", results["queries"], "%d"),
+    ("skill setup (s)", results["skill_setup_s"], "%.3f"),
+    ("throughput (q/s)", results["throughput_qps"], "%.1f"),
+    ("latency p50 (ms)", results["latency_ms"]["p50"], "%.3f"),
+    ("latency p95 (ms)", results["latency_ms"]["p95"], "%.3f"),
+    ("latency p99 (ms)", results["latency_ms"]["p99"], "%.3f"),
+    ("accuracy", results["accuracy"], "%.3f"),
+    ("mean confidence", results["stats"]["routing"]["mean_confidence"],
+      "%.3f"),
+    ("early exits", results["stats"]["routing"]["early_exits"], "%d")
+  ]
+  base_rows = {}
+  if baseline is not None:
+    base_rows = {
+      "queries": baseline["queries"],
+      "skill setup (s)": baseline["skill_setup_s"],
+      "throughput (q/s)": baseline["throughput_qps"],
+      "latency p50 (ms)": baseline["latency_ms"]["p50"],
+      "latency p95 (ms)": baseline["latency_ms"]["p95"],
+      "latency p99 (ms)": baseline["latency_ms"]["p99"],
+      "accuracy": baseline["accuracy"]
+    }
+    if "routing" in baseline["stats"]:
+      base_rows["mean confidence"] = \
+        baseline["stats"]["routing"]["mean_confidence"]
+      base_rows["early exits"] = baseline["stats"]["routing"]["early_exits"]
+    print("Comparing %s against %s" % (results["commit"], baseline["commit"]))
+
+  for (name, value, value_format) in rows:
+    line = "%-18s " % name + value_format % value
+    if name in base_rows:
+      line += "  (was " + value_format % base_rows[name]
+      if base_rows[name] != 0:
+        line += ", %+.1f%%" % ((value - base_rows[name]) / base_rows[name] \
+          * 100)
+      line += ")"
+    print(line)
+
+  for (query, route) in sorted(results["misrouted"].items()):
+    if baseline is None or query not in baseline["misrouted"]:
+      print("Misrouted: '%s' expected %s, answered by %s" % (query,
+        route["expected"], route["answered_by"]))
+
+
+def main():
+  default_nltk_data = os.path.join(os.environ.get("XDG_DATA_HOME",
+    os.path.expanduser("~/.local/share")), APP_ID, "data", "nltk")
+
+  parser = argparse.ArgumentParser(description="Benchmark skill inference")
+  parser.add_argument("--rounds", type=int, default=3,
+    help="Number of times the whole corpus is run")
+  parser.add_argument("--per-pattern", type=int, default=4,
+    help="Max number of queries generated from every intent pattern")
+  parser.add_argument("--seed", type=int, default=0,
+    help="Seed used to pick the generated queries")
+  parser.add_argument("--speculative", action="store_true",
+    help="Run the shortlisted skills in parallel")
+  parser.add_argument("--confidence-threshold", type=float, default=0.9,
+    help="Routing confidence at which only the best candidate is tried")
+  parser.add_argument("--nltk-data", default=default_nltk_data,
+    help="Folder with the NLTK punkt and tagger data")
+  parser.add_argument("--output", help="Save the results to this JSON file")
+  parser.add_argument("--compare",
+    help="Compare the results with the ones saved in this JSON file")
+  args = parser.parse_args()
+
+  results = run(args)
+
+  baseline = None
+  if args.compare is not None:
+    with open(args.compare, encoding="utf-8") as baseline_file:
+      baseline = json.load(baseline_file)
+
+  print_results(results, baseline)
+
+  if args.output is not None:
+    with open(args.output, "w", encoding="utf-8") as output_file:
+      json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+  main()
@@ -9,7 +9,7 @@ App Search skill for Gandiva
 #pylint: disable=invalid-name
 #pylint: disable=unused-argument
 
-from gandiva.core.skill_backend import Skill, Intent
+from gandiva.core.skill_backend import Skill
 
 class AppSearchSkill(Skill):
   """
@@ -21,80 +21,6 @@ class AppSearchSkill(Skill):
   def __init__(self, skill_backend):
     super().__init__(skill_backend)
 
-    self.direct_launch_intent = Intent(
-      'direct_launch',
-      [
-        '[launch,open] {name,NN,JJ} {subname,NN,JJ}',
-        '[launch,open] {name,NN,JJ}',
-        '[launch,open] the app called {name,NN,JJ} {subname,NN,JJ}'
-        '[launch,open] the app called {name,NN,JJ}'
-        '[launch,open] the {name,NN,JJ} {subname,NN,JJ} app'
-        '[launch,open] the {name,NN,JJ} app'
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.direct_launch_handler,
-      self.direct_launch_intent, 'Open Firefox')
-
-    self.keyword_search_intent = Intent(
-      'keyword_search',
-      [
-        '[find,search,show] all apps by [name,keyword] {keyword,NN,JJ}',
-        '[find,search,show] all apps [name,keyword] {keyword,NN,JJ}',
-        '[find,search,show] apps by [name,keyword] {keyword,NN,JJ}',
-        '[find,search,show] apps [name,keyword] {keyword,NN,JJ}',
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.keyword_app_search_handler,
-      self.keyword_search_intent, 'Search apps by keyword game')
-
-    self.category_search_intent = Intent(
-      'category_app_search',
-      [
-        '[find,search,show] all the {category,NN,JJ} apps',
-        '[find,search,show] all my {category,NN,JJ} apps',
-        '[find,search,show] the {category,NN,JJ} apps',
-        'search for {category,NN,JJ} apps',
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.category_search_handler,
-      self.category_search_intent, 'Show all my music apps')
-
-    self.search_games_intent = Intent(
-      'category_app_search',
-      [
-        '[find,search,show] all the games',
-        '[find,search,show] all my games',
-        '[find,search,show] the games',
-        'search for games',
-        'i want to play games',
-        'i wanna play games'
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.games_search_handler,
-      self.search_games_intent, 'Search for games')
-
-    self.search_accessories_intent = Intent(
-      'category_app_search',
-      [
-        '[find,search,show] all the [accessories,utilities]',
-        '[find,search,show] all my [accessories,utilities]',
-        '[find,search,show] the [accessories,utilities]',
-        'search for [accessories,utilities]',
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.accessories_search_handler,
-      self.search_accessories_intent, 'Find the accessories')
-
 
   def direct_launch_handler(self, subjects, context, query, tags,
     lang:str, datadir:str):
@@ -123,7 +49,7 @@ class AppSearchSkill(Skill):
 
   def category_search_handler(self, subjects, context, query, tags,
     lang:str, datadir:str):
-    if 'apps' not in query:
+    if not query.has_word('apps'):
       return None
 
     if 'category' in subjects.keys():
@@ -137,7 +63,7 @@ class AppSearchSkill(Skill):
 
   def games_search_handler(self, subjects, context, query, tags,
     lang:str, datadir:str):
-    if 'games' not in query:
+    if not query.has_word('games'):
       return None
 
     return { 'type': 'internal-action', 'action': 'app-search-games',
@@ -10,7 +10,7 @@ Date and time skill for Gandiva
 #pylint: disable=unused-argument
 
 from typing import Dict, List
-from gandiva.core.skill_backend import Skill, Intent
+from gandiva.core.skill_backend import Skill
 import random
 from datetime import datetime
 
@@ -22,18 +22,6 @@ class DateTimeSkill(Skill):
   def __init__(self, skill_backend):
     super().__init__(skill_backend)
 
-    self.time_intent = Intent(
-      "time",
-      [
-        "what time is it",
-        "could you please tell me the time",
-        "may i know the time",
-        "what's the time",
-        "time"
-      ],
-      "en-us"
-    )
-
     self.time_answers = [
       "The time's ",
       "It is ",
@@ -41,22 +29,6 @@ class DateTimeSkill(Skill):
       "The time is "
     ]
 
-    self.register_intent(self.time_intent_handler, self.time_intent,
-      "What time is it?")
-
-    self.date_intent = Intent(
-      "date",
-      [
-        "what date is [today,it]",
-        "what's the date today",
-        "what is the date today",
-        "what is the date",
-        "what's the date",
-        "what is today's date"
-      ],
-      "en-us"
-    )
-
     self.date_answers = [
       "Sure! Today's date is ",
       "Sure! Today is  ",
@@ -65,13 +37,10 @@ class DateTimeSkill(Skill):
       "It's "
     ]
 
-    self.register_intent(self.date_intent_handler, self.date_intent,
-      "What is the date?")
-
   # Reference: https://www.programiz.com/python-programming/datetime/strftime
   def time_intent_handler(self, subjects:Dict, context:Dict, query: str,
     tags:List, lang:str, datadir:str):
-    if "time" in query:
+    if query.has_word("time"):
       answer = random.choice(self.time_answers)
       time_now = datetime.now()
       time_string = time_now.strftime("%I:%M %p")
@@ -82,7 +51,7 @@ class DateTimeSkill(Skill):
 
   def date_intent_handler(self, subjects:Dict, context:Dict, query:str,
     tags:List, lang:str, datadir:str):
-    if "date" in query:
+    if query.has_word("date"):
       answer = random.choice(self.date_answers)
       date_now = datetime.now()
       date_string = date_now.strftime("%x")
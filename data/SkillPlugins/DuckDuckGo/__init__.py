@@ -10,7 +10,7 @@ DuckDuckGo skill for Gandiva
 #pylint: disable=unused-argument
 
 from typing import Dict, List
-from gandiva.core.skill_backend import Skill, Intent
+from gandiva.core.skill_backend import Skill
 
 import gi
 #pylint: disable=wrong-import-position
@@ -31,26 +31,10 @@ class DuckDuckGoSkill(Skill):
     # Always use portal to connect to internet
     self.portal = skill_backend.portal
 
-    self.topic_intent = Intent(
-      'generic',
-      [
-        '[what,who] [is,was,are,were] [a,an,the] {subject,JJ,NN,NNS}',
-        '[what,who] [is,was,are,were] {subject,JJ,NN,NNS}',
-        'tell me about {subject,JJ,NN,NNS}'
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.search_topic_intent_handler, self.topic_intent,
-      'Tell me about Jupiter')
-
-    self.register_intent(self.fallback_intent_handler, None,
-      'Valley Forge National Park', True)
-
     self.URL = 'https://api.duckduckgo.com'
 
 
-  def __send_query(self, query: str):
+  async def __send_query(self, query: str):
     PARAMS = {
       'q': query,
       'format': 'json',
@@ -58,7 +42,7 @@ class DuckDuckGoSkill(Skill):
       'no_html': 1,
       'skip_disambig': 1
     }
-    raw_result = self.portal.http_get(self.URL, PARAMS)
+    raw_result = await self.portal.http_get_async(self.URL, PARAMS)
 
     if raw_result is not None:
       result = raw_result.json()
@@ -74,15 +58,15 @@ class DuckDuckGoSkill(Skill):
       return None, None
 
 
-  def search_topic_intent_handler(self, subjects:Dict, context:Dict, query:str,
-    tags:List, lang:str, datadir:str):
+  async def search_topic_intent_handler(self, subjects:Dict, context:Dict,
+    query:str, tags:List, lang:str, datadir:str):
     query = ''
     if 'subject' in subjects:
       query = subjects['subject']
     else:
       return None
 
-    main_answer, image_url = self.__send_query(query)
+    main_answer, image_url = await self.__send_query(query)
     if main_answer is None or len(main_answer) == 0:
       return None
 
@@ -102,7 +86,8 @@ class DuckDuckGoSkill(Skill):
     main_box.append(answer_label)
 
     if image_url is not None:
-      response = self.portal.http_get('https://duckduckgo.com' + image_url, {})
+      response = await self.portal.http_get_async(
+        'https://duckduckgo.com' + image_url, {})
       if response is not None and not response.content.startswith(b'GIF'):
         loader = GdkPixbuf.PixbufLoader()
         loader.write(response.content)
@@ -120,8 +105,9 @@ class DuckDuckGoSkill(Skill):
 
 
 
-  def fallback_intent_handler(self, query: str, tags:List, datadir:str):
-    main_answer, image_url = self.__send_query(query)
+  async def fallback_intent_handler(self, query: str, tags:List, datadir:str):
+    # Send the query as the user entered it, not lowercased
+    main_answer, image_url = await self.__send_query(query.raw)
     if main_answer is None or len(main_answer) == 0:
       return None
 
@@ -141,7 +127,8 @@ class DuckDuckGoSkill(Skill):
     main_box.append(answer_label)
 
     if image_url is not None:
-      response = self.portal.http_get('https://duckduckgo.com' + image_url, {})
+      response = await self.portal.http_get_async(
+        'https://duckduckgo.com' + image_url, {})
       if response is not None and not response.content.startswith(b'GIF'):
         loader = GdkPixbuf.PixbufLoader()
         loader.write(response.content)
@@ -9,7 +9,7 @@ File system search skill for Gandiva
 #pylint: disable=invalid-name
 #pylint: disable=unused-argument
 
-from gandiva.core.skill_backend import Skill, Intent
+from gandiva.core.skill_backend import Skill
 
 class FileSystemSearchSkill(Skill):
   """
@@ -23,35 +23,6 @@ class FileSystemSearchSkill(Skill):
   def __init__(self, skill_backend):
     super().__init__(skill_backend)
 
-    self.keyword_search_intent = Intent(
-      'keyword_search',
-      [
-        '[find,search,show] all files by [name,keyword] {keyword,NN,JJ}',
-        '[find,search,show] all files [name,keyword] {keyword,NN,JJ}',
-        '[find,search,show] files by [name,keyword] {keyword,NN,JJ}',
-        '[find,search,show] files [name,keyword] {keyword,NN,JJ}'
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.keyword_search_handler,
-      self.keyword_search_intent, 'Search files by keyword wallpaper')
-
-    self.library_intent = Intent(
-      'library',
-      [
-        'open the xdg [folder,directory] of {library,NN,NNP}',
-        'open xdg [folder,directory] of {library,NN,NNP}',
-        'open {library,NN,NNP} library',
-        'open [a,the] library of {library,NN,NNP}',
-        'open library of {library,NN,NNP}'
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.library_handler,
-      self.library_intent, 'Open Music Library')
-
     # self.attribute_search_intent = Intent(
     #   'attribute',
     #   [
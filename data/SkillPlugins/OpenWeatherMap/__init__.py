@@ -10,7 +10,7 @@ OpenWeatherMap skill for Gandiva
 #pylint: disable=unused-argument
 
 from typing import Dict, List
-from gandiva.core.skill_backend import Skill, Intent
+from gandiva.core.skill_backend import Skill
 from gandiva.utils.utilities import BubbleStyle
 
 import gi
@@ -37,25 +37,11 @@ class OpenWeatherMapSkill(Skill):
     # Always use portal to connect to internet
     self.portal = skill_backend.portal
 
-    self.weather_intent = Intent(
-      "weather",
-      [
-        "how is the weather now",
-        "how's the weather now",
-        "how is the weather",
-        "how's the weather"
-      ],
-      "en-us"
-    )
 
-    self.register_intent(self.intent_handler, self.weather_intent,
-      "How's the weather now?")
-
-
-  def intent_handler(self, subjects:Dict, context:Dict, query:str,
+  async def intent_handler(self, subjects:Dict, context:Dict, query:str,
     tags:List, lang:str, datadir:str):
     URL = "https://api.openweathermap.org/data/2.5/weather"
-    latlng = self.portal.get_location()
+    latlng = await self.portal.get_location_async()
     if latlng is not None:
       PARAMS = {
         "lat": latlng[0],
@@ -65,7 +51,7 @@ class OpenWeatherMapSkill(Skill):
     else:
       return None
 
-    api_response = self.portal.http_get(URL, PARAMS).json()
+    api_response = (await self.portal.http_get_async(URL, PARAMS)).json()
 
     speech_response = ""
 
@@ -141,81 +127,90 @@ class OpenWeatherMapSkill(Skill):
         background_color = "#C0C2BF"
         foreground_color = "#333333"
 
-      main_grid = Gtk.Grid()
-      main_grid.set_column_homogeneous(True)
+      build_widget = lambda: self.build_widget(datadir, place,
+        weather["description"], temp, humidity, wind_speed, icon)
 
-      upper_grid = Gtk.Grid()
-      upper_grid.set_margin_start(8)
-      upper_grid.set_margin_end(8)
-      upper_grid.set_margin_top(8)
-      upper_grid.set_margin_bottom(8)
+      bubble_style = BubbleStyle(foreground_color, background_color,
+        background_image, "#000000")
+      return { "type": "widget", "value": build_widget(),
+        "factory": build_widget, "utterance": speech_response,
+        "style": bubble_style }
+    else:
+      return None
 
-      icon_image = self.get_image(datadir, icon, 48)
-      icon_image.set_halign(Gtk.Align.START)
-      upper_grid.attach(icon_image, 0, 0, 1, 2)
 
-      location_label = Gtk.Label()
-      location_label.set_text(place.upper())
-      location_label.set_halign(Gtk.Align.END)
-      location_label.set_valign(Gtk.Align.END)
-      location_label.set_hexpand(True)
-      location_label.set_ellipsize(Pango.EllipsizeMode.END)
-      location_label.get_style_context().add_class("bold")
-      upper_grid.attach(location_label, 1, 0, 1, 1)
+  def build_widget(self, datadir:str, place:str, description:str, temp:float,
+    humidity:float, wind_speed:float, icon:str) -> Gtk.Grid:
+    main_grid = Gtk.Grid()
+    main_grid.set_column_homogeneous(True)
 
-      condition_label = Gtk.Label()
-      condition_label.set_halign(Gtk.Align.END)
-      condition_label.set_valign(Gtk.Align.START)
-      condition_label.set_text(weather["description"].capitalize())
-      upper_grid.attach(condition_label, 1, 1, 1, 1)
+    upper_grid = Gtk.Grid()
+    upper_grid.set_margin_start(8)
+    upper_grid.set_margin_end(8)
+    upper_grid.set_margin_top(8)
+    upper_grid.set_margin_bottom(8)
 
-      main_grid.attach(upper_grid, 0, 0, 3, 1)
+    icon_image = self.get_image(datadir, icon, 48)
+    icon_image.set_halign(Gtk.Align.START)
+    upper_grid.attach(icon_image, 0, 0, 1, 2)
 
-      # main_grid.attach(Gtk.Separator(), 0, 1, 3, 1)
+    location_label = Gtk.Label()
+    location_label.set_text(place.upper())
+    location_label.set_halign(Gtk.Align.END)
+    location_label.set_valign(Gtk.Align.END)
+    location_label.set_hexpand(True)
+    location_label.set_ellipsize(Pango.EllipsizeMode.END)
+    location_label.get_style_context().add_class("bold")
+    upper_grid.attach(location_label, 1, 0, 1, 1)
 
-      temp_box = Gtk.Box()
-      temp_box.set_margin_start(8)
+    condition_label = Gtk.Label()
+    condition_label.set_halign(Gtk.Align.END)
+    condition_label.set_valign(Gtk.Align.START)
+    condition_label.set_text(description.capitalize())
+    upper_grid.attach(condition_label, 1, 1, 1, 1)
 
-      temp_image = self.get_image(datadir, "temp", 16)
-      temp_box.append(temp_image)
+    main_grid.attach(upper_grid, 0, 0, 3, 1)
 
-      temp_label = Gtk.Label()
-      temp_label.set_text("%.1f°" % (temp - 273.15,))
-      temp_box.append(temp_label)
+    # main_grid.attach(Gtk.Separator(), 0, 1, 3, 1)
 
-      main_grid.attach(temp_box, 0, 2, 1, 1)
+    temp_box = Gtk.Box()
+    temp_box.set_margin_start(8)
 
-      humidity_box = Gtk.Box()
-      humidity_box.set_margin_bottom(8)
-      humidity_box.set_margin_top(8)
+    temp_image = self.get_image(datadir, "temp", 16)
+    temp_box.append(temp_image)
 
-      humidity_image = self.get_image(datadir, "humidity", 16)
-      humidity_box.append(humidity_image)
+    temp_label = Gtk.Label()
+    temp_label.set_text("%.1f°" % (temp - 273.15,))
+    temp_box.append(temp_label)
 
-      humidity_label = Gtk.Label()
-      humidity_label.set_text("%.f%%" % (humidity))
-      humidity_box.append(humidity_label)
+    main_grid.attach(temp_box, 0, 2, 1, 1)
 
-      main_grid.attach(humidity_box, 1, 2, 1, 1)
+    humidity_box = Gtk.Box()
+    humidity_box.set_margin_bottom(8)
+    humidity_box.set_margin_top(8)
 
-      wind_speed_box = Gtk.Box()
-      wind_speed_box.set_margin_end(8)
+    humidity_image = self.get_image(datadir, "humidity", 16)
+    humidity_box.append(humidity_image)
 
-      wind_speed_image = self.get_image(datadir, "wind_speed", 16)
-      wind_speed_box.append(wind_speed_image)
+    humidity_label = Gtk.Label()
+    humidity_label.set_text("%.f%%" % (humidity))
+    humidity_box.append(humidity_label)
 
-      wind_speed_label = Gtk.Label()
-      wind_speed_label.set_text("%.1f" % (wind_speed))
-      wind_speed_box.append(wind_speed_label)
+    main_grid.attach(humidity_box, 1, 2, 1, 1)
 
-      main_grid.attach(wind_speed_box, 2, 2, 1, 1)
+    wind_speed_box = Gtk.Box()
+    wind_speed_box.set_margin_end(8)
 
-      bubble_style = BubbleStyle(foreground_color, background_color,
-        background_image, "#000000")
-      return { "type": "widget", "value": main_grid,
-        "utterance": speech_response, "style": bubble_style }
-    else:
-      return None
+    wind_speed_image = self.get_image(datadir, "wind_speed", 16)
+    wind_speed_box.append(wind_speed_image)
+
+    wind_speed_label = Gtk.Label()
+    wind_speed_label.set_text("%.1f" % (wind_speed))
+    wind_speed_box.append(wind_speed_label)
+
+    main_grid.attach(wind_speed_box, 2, 2, 1, 1)
+
+    return main_grid
 
 
   def get_image(self, datadir:str, name:str, size:int) -> Gtk.Image:
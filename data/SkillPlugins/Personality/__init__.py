@@ -10,7 +10,7 @@ Personality skill for Gandiva
 #pylint: disable=unused-argument
 
 from typing import Dict, List
-from gandiva.core.skill_backend import Skill, Intent
+from gandiva.core.skill_backend import Skill
 import random
 
 class PersonalitySkill(Skill):
@@ -25,15 +25,6 @@ class PersonalitySkill(Skill):
     # Always use portal to connect to internet
     self.portal = skill_backend.portal
 
-    self.generic_intent = Intent(
-      "generic",
-      [
-        "[what,who] are you",
-        "what is your {name,NN}"
-      ],
-      "en-us"
-    )
-
     self.answers = [
       "I am Gandiva. I am an AI program designed to help you.",
       "I am an AI program designed to help you with stuff. \
@@ -45,19 +36,6 @@ class PersonalitySkill(Skill):
       "I am called Gandiva"
     ]
 
-    self.register_intent(self.intent_handler, self.generic_intent)
-
-    self.creation_intent = Intent(
-      "creation",
-      [
-        "who [made,created] you",
-        "who [makes,creates,maintains] you",
-      ],
-      "en-us"
-    )
-
-    self.register_intent(self.creation_intent_handler, self.creation_intent)
-
     # Some jokes were taken from https://kidadl.com/funnies/jokes/best-computer-science-jokes-that-will-crack-up-any-comp-sci-majors
     # others from https://www.goodhousekeeping.com/life/parenting/g28581033/best-jokes-for-kids/
     self.JOKES = [
@@ -73,16 +51,6 @@ class PersonalitySkill(Skill):
       "Why can't you tell a joke to an egg? \
         You don't because it might crack up. He he."
     ]
-    self.joke_intent = Intent(
-      "joke",
-      [
-        "tell me a joke",
-        "make me laugh"
-      ],
-      "en-us"
-    )
-
-    self.register_intent(self.joke_handler, self.joke_intent, "Tell me a joke")
 
 
   def intent_handler(self, subjects:Dict, context:Dict, query:str,
@@ -10,7 +10,7 @@ Wikipedia skill for Gandiva
 #pylint: disable=unused-argument
 
 from typing import Dict, List
-from gandiva.core.skill_backend import Skill, Intent
+from gandiva.core.skill_backend import Skill
 from gandiva.utils.utilities import BubbleStyle
 import re
 import html
@@ -42,20 +42,6 @@ class WikipediaSkill(Skill):
 
     self.html_tag_regex = re.compile('<.*?>')
 
-    self.generic_intent = Intent(
-      'generic',
-      [
-        'search wikipedia for {subject,JJ,NN}',
-        'search for {subject,JJ,NN} on wikipedia',
-        'search wikipedia for [a,an,the] {subject,JJ,NN}',
-        'search for [a,an,the] {subject,JJ,NN} on wikipedia',
-      ],
-      'en-us'
-    )
-
-    self.register_intent(self.intent_handler, self.generic_intent,
-      'Search Wikipedia for Saturn')
-
     # Wikipedia 'W' logo is a registered trademark of Wikimedia
     # https://commons.wikimedia.org/wiki/File:Wikipedia%27s_W.svg
     logo_svg = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
@@ -142,8 +128,8 @@ class WikipediaSkill(Skill):
     self.logo_pixbuf = loader.get_pixbuf()
 
 
-  def intent_handler(self, subjects:Dict, context:Dict, query:str, tags:List,
-    lang:str, datadir:str):
+  async def intent_handler(self, subjects:Dict, context:Dict, query:str,
+    tags:List, lang:str, datadir:str):
     if 'subject' not in subjects.keys():
       return None
 
@@ -157,7 +143,7 @@ class WikipediaSkill(Skill):
       'srlimit': 2,
       'srsearch': subjects['subject']
     }
-    response = self.portal.http_get(URL, PARAMS)
+    response = await self.portal.http_get_async(URL, PARAMS)
     if response is None:
       return None
 
@@ -172,6 +158,15 @@ class WikipediaSkill(Skill):
       url = 'https://en.wikipedia.org/wiki/' + parse.quote(data['title'])
       possible_results += [[clean_text, url]]
 
+    build_widget = lambda: self.build_widget(possible_results)
+
+    return { 'type': 'widget', 'value': build_widget(),
+      'factory': build_widget,
+      'utterance': 'According to Wikipedia. ' + tts_output,
+      'style': self.bubble_style }
+
+
+  def build_widget(self, possible_results:List) -> Gtk.Box:
     open_link = lambda x: self.portal.open_uri(possible_results[
       int(carousel.get_position())
     ][1])
@@ -207,6 +202,4 @@ class WikipediaSkill(Skill):
     link_button.set_child(wikipedia_logo)
     link_button.connect('clicked', open_link)
 
-    return { 'type': 'widget', 'value': main_widget,
-      'utterance': 'According to Wikipedia. ' + tts_output,
-      'style': self.bubble_style }
+    return main_widget
@@ -39,3 +39,19 @@ def get_voice_activation_mode() -> bool:
 
 def set_voice_activation_mode(active: bool):
   _GIO_SETTINGS.set_boolean('voice-invoke', active)
+
+
+def get_fallback_timeout() -> float:
+  return _GIO_SETTINGS.get_double('fallback-timeout')
+
+
+def get_speculative_inference() -> bool:
+  return _GIO_SETTINGS.get_boolean('speculative-inference')
+
+
+def get_confidence_threshold() -> float:
+  return _GIO_SETTINGS.get_double('confidence-threshold')
+
+
+def get_listening_pre_roll() -> float:
+  return _GIO_SETTINGS.get_double('listening-pre-roll')
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the audio capture, which records from the microphone in a single
+thread into a ring buffer shared by the wakeword engine and the speech-to-text
+system. The microphone stays open while either of them is listening, so
+handing over from one to the other doesn't wait for the device to open, and
+the speech-to-text system can start from audio recorded a little before it was
+asked to listen.
+"""
+
+# Base imports
+import alsaaudio
+import math
+import threading
+import _thread
+
+
+# Based on solution from
+# https://stackoverflow.com/questions/6867675/audio-recording-in-python
+
+#--------------CLASS-SEPARATOR---------------#
+
+class AudioReader():
+  """
+  ## Audio Reader
+  Reads the periods of audio in a capture ring buffer, in
+  order, from a position of its own. Readers that fall
+  behind by more than the size of the buffer skip the audio
+  that was overwritten.
+  """
+
+  def __init__(self, capture, position:int):
+    self.__capture = capture
+    self.position = position
+    self.closed = False
+
+    # Set by the capture thread whenever there's new audio
+    self.available = threading.Event()
+
+
+  def read(self, timeout:float=None) -> bytes:
+    """
+    Get the next period of audio, waiting for it if it hasn't been recorded
+    yet. Returns `None` if no audio came in before the timeout, or if the
+    reader was closed.
+
+    :param timeout: Max number of seconds to wait, or `None` to wait until
+    there's audio
+    :type timeout: float
+    """
+    while not self.closed:
+      self.available.clear()
+      data = self.__capture.get_period(self)
+      if data is not None:
+        return data
+      if not self.available.wait(timeout):
+        return None
+
+    return None
+
+
+  def close(self):
+    """
+    Stop reading. The microphone is closed once every reader is closed.
+    """
+    self.closed = True
+    self.available.set()
+    self.__capture.remove_reader(self)
+
+#--------------CLASS-SEPARATOR---------------#
+
+class AudioCapture():
+  """
+  ## Audio Capture
+  Records mono 16 bit audio from the default capture device
+  in one thread, into a ring buffer of periods. The buffer
+  has a single writer, so it's written to without locks:
+  a period is stored before the write position moves past
+  it, and readers check that it wasn't overwritten while
+  they read it.
+
+  Recording starts with the first reader and stops when
+  the last one is closed.
+  """
+
+  # Number of frames in a period of audio
+  PERIOD_SIZE = 1024
+
+  def __init__(self, sample_rate:int, buffer_seconds:float=2):
+    """
+    :param sample_rate: Rate to record at, in Hz
+    :type sample_rate: int
+    :param buffer_seconds: Length of the audio kept in the ring buffer
+    :type buffer_seconds: float
+    """
+    self.sample_rate = sample_rate
+    self.__size = max(2, math.ceil(buffer_seconds * sample_rate \
+      / AudioCapture.PERIOD_SIZE))
+    self.__periods = [None] * self.__size
+
+    # Number of periods recorded so far
+    self.__write_position = 0
+
+    self.__lock = threading.Lock()
+    self.__readers = []
+    self.__recording = False
+    self.__thread_running = False
+
+
+  def open_reader(self, pre_roll:float=0) -> AudioReader:
+    """
+    Get a reader of the recorded audio, starting the recording if it
+    isn't running.
+
+    :param pre_roll: Number of seconds of audio from before this call that
+    the reader starts with, if they're still in the buffer. This only applies
+    if the capture is already recording, since otherwise the buffer has the
+    audio of an earlier recording.
+    :type pre_roll: float
+    """
+    pre_roll_periods = min(self.__size - 1, math.ceil(pre_roll \
+      * self.sample_rate / AudioCapture.PERIOD_SIZE))
+    with self.__lock:
+      write_position = self.__write_position
+      if not self.__recording:
+        pre_roll_periods = 0
+      reader = AudioReader(self, max(0, write_position - pre_roll_periods))
+      self.__readers += [reader]
+      self.__recording = True
+      if not self.__thread_running:
+        self.__thread_running = True
+        _thread.start_new_thread(self.__record, ())
+
+    return reader
+
+
+  def remove_reader(self, reader:AudioReader):
+    with self.__lock:
+      if reader in self.__readers:
+        self.__readers.remove(reader)
+      if len(self.__readers) == 0:
+        self.__recording = False
+
+
+  def get_period(self, reader:AudioReader) -> bytes:
+    """
+    Get the period of audio at the position of a reader and move the reader
+    past it, or get `None` if it hasn't been recorded yet.
+    """
+    while True:
+      write_position = self.__write_position
+      if reader.position >= write_position:
+        return None
+
+      # Skip whatever was overwritten, along with the period being written
+      reader.position = max(reader.position, write_position - self.__size + 1)
+      data = self.__periods[reader.position % self.__size]
+      if self.__write_position - reader.position < self.__size:
+        reader.position += 1
+        return data
+
+
+  def __record(self):
+    """
+    Recording thread function
+    """
+    while True:
+      # Initialize alsa instance
+      sound_input = alsaaudio.PCM(alsaaudio.PCM_CAPTURE)
+      sound_input.setchannels(1)
+      sound_input.setrate(self.sample_rate)
+      sound_input.setformat(alsaaudio.PCM_FORMAT_S16_LE)
+      sound_input.setperiodsize(AudioCapture.PERIOD_SIZE)
+      while self.__recording:
+        length, data = sound_input.read()
+        if length <= 0:
+          continue
+        self.__periods[self.__write_position % self.__size] = data
+        self.__write_position += 1
+        for reader in list(self.__readers):
+          reader.available.set()
+      sound_input.close()
+
+      # Keep going if a reader was opened while the device was being closed
+      with self.__lock:
+        if not self.__recording:
+          self.__thread_running = False
+          return
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the context store, which holds the context variables that
+skills use to assume the subject of follow-up queries with pronouns (like
+"how old is he?"). Every skill gets its own namespace, so a skill's context is
+found without going through the context of every other skill, and every
+namespace is bounded in size, with entries that can expire.
+
+There's a single store, `skill_context`, kept in this module. Skills import
+the skill backend as `gandiva.core.skill_backend`, while the inference engine
+imports it as `skill_backend`, so a store kept in the skill backend would be
+a different one for each of them.
+"""
+
+# Base imports
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+#--------------CLASS-SEPARATOR---------------#
+
+class ContextNamespace(Mapping):
+  """
+  ## Context Namespace
+  Context variables of a single skill. It can be read like
+  a dictionary, and is written to with `set()`.
+
+  When it's full, the least recently used entry is evicted.
+  Entries can be given a time-to-live, after which they
+  are dropped.
+  """
+
+  def __init__(self, max_size:int):
+    self.__max_size = max_size
+    self.__lock = threading.RLock()
+    # Values and their expiry times, or `None` if they don't expire
+    self.__entries = OrderedDict()
+
+
+  def __get_entry(self, key:str):
+    """
+    Get the value and expiry of an entry, dropping it if it has expired.
+    """
+    entry = self.__entries.get(key)
+    if entry is not None and entry[1] is not None \
+      and entry[1] <= time.monotonic():
+      del self.__entries[key]
+      return None
+
+    return entry
+
+
+  def set(self, key:str, value, ttl:float=None):
+    """
+    Set a context variable.
+
+    :param key: Name of the variable, like `subject`
+    :type key: str
+    :param value: Value of the variable
+    :param ttl: Number of seconds after which the variable is dropped, or
+    `None` to keep it until it's evicted
+    :type ttl: float
+    """
+    with self.__lock:
+      self.__entries[key] = (value, None if ttl is None \
+        else time.monotonic() + ttl)
+      self.__entries.move_to_end(key)
+      while len(self.__entries) > self.__max_size:
+        self.__entries.popitem(last=False)
+
+
+  def delete(self, key:str):
+    """
+    Remove a context variable, if it's set.
+    """
+    with self.__lock:
+      self.__entries.pop(key, None)
+
+
+  def clear(self):
+    with self.__lock:
+      self.__entries.clear()
+
+
+  def __getitem__(self, key:str):
+    with self.__lock:
+      entry = self.__get_entry(key)
+      if entry is None:
+        raise KeyError(key)
+      self.__entries.move_to_end(key)
+      return entry[0]
+
+
+  def __contains__(self, key) -> bool:
+    with self.__lock:
+      return self.__get_entry(key) is not None
+
+
+  def __iter__(self):
+    with self.__lock:
+      keys = [key for key in list(self.__entries) \
+        if self.__get_entry(key) is not None]
+
+    return iter(keys)
+
+
+  def __len__(self) -> int:
+    return len(list(iter(self)))
+
+#--------------CLASS-SEPARATOR---------------#
+
+class ContextStore():
+  """
+  ## Context Store
+  Holds a context namespace for every skill, created when
+  it's first used.
+  """
+
+  def __init__(self, max_size:int=32):
+    """
+    :param max_size: Max number of variables in the namespace of a skill
+    :type max_size: int
+    """
+    self.__max_size = max_size
+    self.__lock = threading.Lock()
+    self.__namespaces = {}
+
+
+  def get_namespace(self, skill_name:str) -> ContextNamespace:
+    """
+    Get the context namespace of a skill.
+
+    :param skill_name: Name of the skill, like `WikipediaSkill`
+    :type skill_name: str
+    """
+    namespace = self.__namespaces.get(skill_name)
+    if namespace is None:
+      with self.__lock:
+        namespace = self.__namespaces.setdefault(skill_name,
+          ContextNamespace(self.__max_size))
+
+    return namespace
+
+
+  def clear(self):
+    """
+    Drop the context of every skill.
+    """
+    with self.__lock:
+      self.__namespaces.clear()
+
+
+# Context of every skill, shared by the skills and the inference engine
+skill_context = ContextStore()
@@ -13,6 +13,8 @@ back to the user and going back to listening and so on…
 
 # Base imports
 import _thread
+import asyncio
+import os
 import time
 import subprocess
 import random
@@ -25,7 +27,10 @@ from tts import TextToSpeech
 from file_system_search import FileSystemSearch
 from app_search import AppSearch
 from inference_engine import InferenceEngine
-from config import settings
+from audio_capture import AudioCapture
+from model_registry import ModelRegistry
+from query import clean_text
+from config import constants, settings
 from utils import utilities
 from utils.utilities import BubbleStyle
 
@@ -47,6 +52,7 @@ class CoreLoop():
     # Callbacks
     self.__recognition_begin_callback = None
     self.__recognition_end_callback = None
+    self.__partial_recognition_callback = None
     self.__audio_callback = None
     self.__audio_output_callback = None
     self.__file_found_callback = None
@@ -66,17 +72,31 @@ class CoreLoop():
     # Inference Engine or the brain of the app
     # Infers the answer or action based on skills
     # (elementary abilities added to the app)
-    self.__inference_engine = InferenceEngine()
+    self.__inference_engine = InferenceEngine(
+      fallback_timeout=settings.get_fallback_timeout(),
+      speculative=settings.get_speculative_inference(),
+      confidence_threshold=settings.get_confidence_threshold())
     self.__inference_engine.connect_portal_error_callback(
         self.handle_portal_error)
 
+    # Event loop for skills with `async def` intent handlers, so that their
+    # I/O can overlap without holding up the core loop thread
+    self.__event_loop = asyncio.new_event_loop()
+    _thread.start_new_thread(self.__event_loop.run_forever, ())
+    self.__inference_engine.set_event_loop(self.__event_loop)
+
+    # Microphone input shared by the wakeword engine and speech recognition
+    self.__audio_capture = AudioCapture(ModelRegistry.get_sample_rate())
+
     # VOSK Speech recognition system
-    self.stt = SpeechTotext()
+    self.stt = SpeechTotext(self.__audio_capture,
+      settings.get_listening_pre_roll())
     self.stt.connect("audio", self.handle_audio_input)
     self.stt.connect("recognition-complete", self.query_utterance)
+    self.stt.connect("partial-recognition", self.handle_partial_recognition)
 
     # Wakeword or "hot word" engine
-    self.wake_word_engine = WakeWordEngine()
+    self.wake_word_engine = WakeWordEngine(self.__audio_capture)
     self.wake_word_engine.connect(self.start_listening)
     if settings.get_voice_activation_mode() and not settings.get_first_run():
       self.wake_word_engine.start()
@@ -88,13 +108,19 @@ class CoreLoop():
     # Thread inputs
     self.__alive = True
     self.__live_query = ""
+    self.__partial_query = ""
     self.__query = ""
     self.__utterance = ""
     self.__system_update = False
     self.__system_index = False
     self.__system_update_skills = False
+    self.__system_stats = False
     self.__initialize_core_loop = False
 
+    # Time spent speaking, which doesn't count as rendering the results
+    self.__speech_start = 0
+    self.__speech_time = 0
+
     self._state = "idle"
 
     # Setup index action
@@ -190,6 +216,24 @@ class CoreLoop():
         self.tts.speak("Skill set updated. I am ready")
         self.stop_audio_output()
 
+      elif self.__system_stats:
+        self.__system_stats = False
+        stats = self.__inference_engine.get_stats()
+        stats_path = os.path.join(GLib.get_user_cache_dir(),
+          constants.APPLICATION_ID, "inference_stats.json")
+        gate_stats = self.wake_word_engine.get_gate_stats()
+        stats.dump(stats_path,
+          { "result_cache": self.__inference_engine.get_cache_stats(),
+            "wake_word_gate": gate_stats })
+        self.__send_response(stats.get_report(), "text", False)
+        self.__send_response("Wakeword engine recognized %.0f%% of the audio"
+          % (gate_stats["pass_rate"] * 100), "text", False)
+        self.__send_response("Full stats saved to %s" % stats_path, "text",
+          False)
+        self.start_audio_output()
+        self.tts.speak("Here are the stats")
+        self.stop_audio_output()
+
       elif len(self.__live_query) > 0:
         app_results = self.__app_search.search(self.__live_query, False, True)
         if self.__app_found_callback is not None:
@@ -209,11 +253,16 @@ class CoreLoop():
         if self.__thinking_callback is not None:
           self.__thinking_callback()
         self.wake_word_engine.stop()
+        self.__partial_query = ""
         results = self.__inference_engine.infer(self.__query)
         self.__query = ""
+        stats = self.__inference_engine.get_stats()
+        rendering_time = 0
         for result in results:
+          speech_time = self.__speech_time
           if result["type"] == "internal-action":
             time.sleep(0.5)
+            render_start = time.perf_counter()
             if result["action"] == "app-launch":
               app_result = self.__app_search.search(result["value"],
                 True, False)
@@ -350,7 +399,14 @@ class CoreLoop():
               self.start_audio_output()
               self.tts.speak(utterance)
               self.stop_audio_output()
+
+            action_time = time.perf_counter() - render_start \
+              - (self.__speech_time - speech_time)
+            stats.record_handler("internal-action", result["action"],
+              action_time, True)
+            rendering_time += action_time
           else:
+            render_start = time.perf_counter()
             self.__send_response(result["value"], result["type"], False,
               result["style"] if "style" in result else None)
             if result["type"] == "text" and "utterance" not in result.keys():
@@ -361,9 +417,18 @@ class CoreLoop():
               self.start_audio_output()
               self.tts.speak(result["utterance"])
               self.stop_audio_output()
+            rendering_time += time.perf_counter() - render_start \
+              - (self.__speech_time - speech_time)
             time.sleep(0.2)
+        stats.record_stage("rendering", rendering_time)
         if settings.get_voice_activation_mode():
           self.wake_word_engine.start()
+      # Route what the user has said so far while they're still speaking, so
+      # the final query doesn't have to be routed again
+      elif len(self.__partial_query) > 0:
+        partial_query = self.__partial_query
+        self.__partial_query = ""
+        self.__inference_engine.prefetch(partial_query)
       elif len(self.__utterance) > 0:
         self.tts.speak(self.__utterance)
         self.__utterance = ""
@@ -411,12 +476,14 @@ class CoreLoop():
 
 
   def start_audio_output(self):
+    self.__speech_start = time.perf_counter()
     if self.__speech_output_start_callback is not None:
       self._state = "speaking"
       self.__speech_output_start_callback()
 
 
   def stop_audio_output(self):
+    self.__speech_time += time.perf_counter() - self.__speech_start
     if self.__speech_output_stop_callback is not None:
       self._state = "idle"
       self.__speech_output_stop_callback()
@@ -453,6 +520,14 @@ class CoreLoop():
       self.__audio_output_callback(buffer)
 
 
+  def handle_partial_recognition(self, text:str, stable:bool):
+    if self.__partial_recognition_callback is not None:
+      partial_lamda = lambda : self.__partial_recognition_callback(text)
+      GLib.idle_add(partial_lamda)
+    if stable:
+      self.__partial_query = clean_text(text)
+
+
   def handle_portal_error(self, message):
     self.__send_response(message, "text", False)
 
@@ -464,6 +539,7 @@ class CoreLoop():
     Supported Event Type Options:
     - `recognition-begin`
     - `recognition-end`
+    - `partial-recognition`
     - `audio-input`
     - `audio-output`
     - `file-query`
@@ -482,6 +558,8 @@ class CoreLoop():
       self.__recognition_begin_callback = callback
     elif event_type == "recognition-end":
       self.__recognition_end_callback = callback
+    elif event_type == "partial-recognition":
+      self.__partial_recognition_callback = callback
     elif event_type == "audio-input":
       self.__audio_callback = callback
     elif event_type == "audio-output":
@@ -515,11 +593,7 @@ class CoreLoop():
 
 
   def query_utterance(self, query: str):
-    proper_query = ""
-    for q in query:
-      if q.isalnum() or q == " " or q == "'":
-        proper_query += q
-    proper_query = proper_query.strip()
+    proper_query = clean_text(query)
 
     if self.__recognition_end_callback is not None:
       self.__recognition_end_callback()
@@ -536,6 +610,8 @@ class CoreLoop():
       self.__system_index = True
     elif proper_query.lower() == "system run relearn":
       self.queue_relearn()
+    elif proper_query.lower() == "system run stats":
+      self.__system_stats = True
     else:
       self.__query = proper_query
     self.__send_response(query.rstrip().capitalize(), "text", True)
@@ -14,19 +14,26 @@ send back the result to the core loop.
 # Base imports
 import random
 import nltk
-import re
 import os
-import sqlite3
+import time
+import asyncio
+import inspect
+import concurrent.futures
 from nltk import data
-from nltk.tag import pos_tag
 from nltk.tokenize import word_tokenize
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from gi.repository import GLib
 
 # Gandiva imports
 from config import constants
 from system_portal import SystemPortal
 from skill_backend import SkillBackend
+from intent_matcher import IntentMatcher
+from query import Query, normalize_text
+from tagger_service import TaggerService
+from result_cache import ResultCache
+from inference_stats import InferenceStats
+from context_store import ContextNamespace
 
 #--------------CLASS-SEPARATOR---------------#
 
@@ -40,10 +47,60 @@ class InferenceEngine():
   handle the query.
   """
 
-  def __init__(self):
+  # Max number of skill handlers that can run at the same time
+  MAX_WORKERS = 4
+
+  # Max number of regular (not `async def`) fallback handlers that can run at
+  # the same time. A thread can't be stopped, so one that is still running
+  # when its deadline passes keeps its slot until the handler returns. These
+  # have their own pool, so that slow fallbacks can only hold up later
+  # fallbacks, and not the intent handlers.
+  MAX_FALLBACK_WORKERS = 4
+
+  # Candidates whose confidence is within this much of the best ranked one
+  # are ordered by cost, local skills first
+  COST_CONFIDENCE_MARGIN = 0.1
+
+  # Skills whose handlers take longer than this on average are treated like
+  # network skills, and faster ones like local skills, once they have been
+  # called enough times
+  LOCAL_COST_MS = 100
+  MIN_COST_SAMPLES = 5
+
+  def __init__(self, fallback_timeout:float=8, speculative:bool=False,
+    confidence_threshold:float=0.9):
+    """
+    :param fallback_timeout: Number of seconds to wait for the fallback intent
+    handlers to answer
+    :type fallback_timeout: float
+    :param speculative: Whether to run all the shortlisted intent handlers at
+    once instead of one after the other
+    :type speculative: bool
+    :param confidence_threshold: Routing confidence (between 0 and 1) at which
+    only the best candidate is tried, without the other candidates. The
+    fallbacks still run if it has no answer. Values above 1 disable this.
+    :type confidence_threshold: float
+    """
     # Callbacks
     self.__portal_error_callback = None
 
+    # Skill handlers are run in these thread pools
+    self.__executor = concurrent.futures.ThreadPoolExecutor(
+      max_workers=InferenceEngine.MAX_WORKERS, thread_name_prefix="skill")
+    self.__fallback_executor = concurrent.futures.ThreadPoolExecutor(
+      max_workers=InferenceEngine.MAX_FALLBACK_WORKERS,
+      thread_name_prefix="fallback")
+    self.__fallback_timeout = fallback_timeout
+    self.__speculative = speculative
+    self.__confidence_threshold = confidence_threshold
+    self.__event_loop = None
+    self.__last_handler = None
+    self.__last_confidence = None
+
+    # Routing of the latest partial query, as a tuple of its normalized text,
+    # the `Query`, its exact match and its routes
+    self.__prefetched = None
+
     # NLTK data path setup
     if not os.path.exists(GLib.get_user_data_dir()):
       os.mkdir(GLib.get_user_data_dir())
@@ -73,11 +130,31 @@ class InferenceEngine():
     self.__db_location = GLib.get_user_cache_dir() + "/" \
       + constants.APPLICATION_ID + "/databases/skills.db"
 
+    # In-memory copy of the skills table used for shortlisting
+    self.__intent_matcher = IntentMatcher()
+
+    # Answers to recent queries
+    self.__result_cache = ResultCache()
+
+    # POS tagger with the tags of recent queries
+    self.__tagger = TaggerService()
+
+    # Latency and outcome of every stage and skill handler
+    self.__stats = InferenceStats()
+
 
   def connect_portal_error_callback(self, callback):
     self.__portal_error_callback = callback
 
 
+  def set_event_loop(self, event_loop:asyncio.AbstractEventLoop):
+    """
+    Set the event loop on which `async def` intent handlers are run.
+    The loop must be running in its own thread.
+    """
+    self.__event_loop = event_loop
+
+
   def portal_error_handler(self, error_type):
     if self.__portal_error_callback is not None:
       message = "Error"
@@ -98,6 +175,10 @@ class InferenceEngine():
     self.download()
     # Scan for skills
     self.__skill_backend.scan_skills()
+    self.__intent_matcher.compile(self.__db_location)
+    self.__result_cache.clear()
+    self.__prefetched = None
+    self.__tagger.warm_up()
 
     return random.sample(self.__skill_backend.example_list,
       min(5, len(self.__skill_backend.example_list)))
@@ -119,229 +200,586 @@ class InferenceEngine():
 
     self.__skill_backend = SkillBackend(True)
     self.__skill_backend.scan_skills()
+    self.__intent_matcher.compile(self.__db_location)
+    self.__result_cache.clear()
+    self.__prefetched = None
 
     return random.sample(self.__skill_backend.example_list,
       min(5, len(self.__skill_backend.example_list)))
 
 
-  def __shortlist(self, cursor:sqlite3.Cursor,
-    tokens:List[str], intent_tag_list:List):
+  def __shortlist(self, tokens:List[str], intent_tag_list:List):
     """
-    Get a small list of skills that best handle the given query.
+    Get a small list of skills that best handle the given query, as a list of
+    the intent pattern rows, their variables and their confidence.
     """
-    largest_matching_results = []
-    variable_list = []
+    short_listed, confidence = self.__intent_matcher.shortlist(tokens,
+      intent_tag_list)
 
-    # Perform a blanket scan by gradually increasing the length of sentence
-    # structure considered for matching. This gives a big list of all skills
-    # whose "intent"s match the given query roughly
-    for i in range(len(intent_tag_list)):
-      short_syntax = " ".join(intent_tag_list[:i]) + "%"
-      cursor.execute("""
-        SELECT * FROM skills
-         WHERE syntax LIKE ?
-      """, (short_syntax,))
-      db_results = cursor.fetchall()
-      if len(db_results) != 0:
-        largest_matching_results = db_results
-      else:
-        # At this point we have exceeded the max length that could be matched
-        break
-
-    n = len(tokens)
-
-    scores = {}
-
-    # Match the inidivdual words to and give the skills a score based on the
-    # most number of matches
-    for result in largest_matching_results:
-      variable_dict = {}
-      result_tags = result[1].split(" ")
-      result_tokens = result[2].split(" ")
-      if result[0] not in scores:
-        scores[result[0]] = 0
-
-      n_result = len(result_tokens)
-      for i in range(n_result if n > n_result else n):
-        # Check if the words match (ignore if it's a variable enclosed within
-        # flower brackets)
-        if re.search("^{.*}$", result_tokens[i]) is None \
-          and tokens[i] == result_tokens[i]:
-          scores[result[0]] += 2
-        # Check is the skill is expecting a variable word
-        elif re.search("^{.*}$", result_tokens[i]) is not None:
-          variable_dict[result_tokens[i].replace("{", "").replace("}", "")] \
-            = tokens[i]
-        else:
-          scores[result[0]] -= 1
-
-        # Bonus points for matching the pos tag as well
-        if intent_tag_list[i] == result_tags[i]:
-          scores[result[0]] += 1
-      variable_list += [variable_dict]
-
-    # most_match = 0
-    most_matched_index = -1
-    second_most_matched_index = -1
-    third_most_matched_index = -1
-    i = 0
-
-    short_listed_keys = sorted(scores, key=scores.get, reverse=True)[:3]
-
-    # TODO: Improve code here to use an array of indices or dynamicaly
-    # generating the result array instead of using fixed indices
-
-    # Get the skill with the highest score
-    for result in largest_matching_results:
-      # The score must be at least the same number of words in the query
-      # for it to be considered valid
-      if scores[result[0]] > n and result[0] in short_listed_keys:
-        if short_listed_keys.index(result[0]) == 0:
-          most_matched_index = i
-        elif short_listed_keys.index(result[0]) == 1:
-          second_most_matched_index = i
-        elif short_listed_keys.index(result[0]) == 2:
-          third_most_matched_index = i
-      i += 1
-
-    if most_matched_index < 0:
-      return [], []
-    elif second_most_matched_index < 0:
-      return [
-        largest_matching_results[most_matched_index]
-      ], [
-        variable_list[most_matched_index]
-      ]
-    elif third_most_matched_index < 0:
-      return [
-        largest_matching_results[most_matched_index],
-        largest_matching_results[second_most_matched_index]
-      ], [
-        variable_list[most_matched_index],
-        variable_list[second_most_matched_index]
-      ]
+    return [self.__intent_matcher.rows[i] for i in short_listed], [
+      self.__intent_matcher.get_variables(i, tokens) for i in short_listed], \
+      confidence
+
+
+  def __prepare(self, queries:List[str], record:bool=True) -> List[Tuple]:
+    """
+    Normalize, tokenize and tag a batch of queries, with all the queries that
+    aren't fixed sentences tagged in one call.
+    Returns a list of `(Query, exact match)` pairs, where the exact match is
+    the one given by the intent matcher, or `None`.
+
+    :param record: Whether to record the time taken in the stats
+    :type record: bool
+    """
+    normalized_queries = [normalize_text(query) for query in queries]
+
+    # Fixed sentences of the intents are already tagged, so look them up
+    # before running the tokenizer and the tagger
+    exact_matches = [self.__intent_matcher.match_sentence(normalized_query) \
+      for normalized_query in normalized_queries]
+    untagged = [i for i in range(len(queries)) if exact_matches[i] is None]
+
+    # Tag the sentences
+    stage_start = time.perf_counter()
+    tokenized = [word_tokenize(normalized_queries[i]) for i in untagged]
+    if record and len(untagged) > 0:
+      self.__stats.record_stage("tokenization",
+        time.perf_counter() - stage_start)
+
+    stage_start = time.perf_counter()
+    tagged = dict(zip(untagged, self.__tagger.tag_many(tokenized)))
+    if record and len(untagged) > 0:
+      self.__stats.record_stage("tagging", time.perf_counter() - stage_start)
+
+    return [(Query(queries[i], exact_matches[i][1] \
+      if exact_matches[i] is not None else tagged[i]), exact_matches[i]) \
+      for i in range(len(queries))]
+
+
+  def __match(self, query:Query, exact_match, record:bool=True) -> Tuple:
+    """
+    Get the intent pattern rows that can handle a query, along with their
+    variables and their confidence.
+
+    :param record: Whether to record the time taken in the stats
+    :type record: bool
+    """
+    stage_start = time.perf_counter()
+    if exact_match is not None:
+      # Fixed sentences have no variables, and match every word and tag
+      routes = [self.__intent_matcher.rows[exact_match[0]]], [{}], [1.0]
     else:
-      return [
-        largest_matching_results[most_matched_index],
-        largest_matching_results[second_most_matched_index],
-        largest_matching_results[third_most_matched_index]
-      ], [
-        variable_list[most_matched_index],
-        variable_list[second_most_matched_index],
-        variable_list[third_most_matched_index]
-      ]
+      routes = self.__shortlist(list(query.tokens), list(query.tags))
+    if record:
+      self.__stats.record_stage("shortlist",
+        time.perf_counter() - stage_start)
+
+    return routes
+
+
+  def __route(self, query:Query, exact_match, routes:Tuple=None) -> Tuple:
+    """
+    Route a query to the intent pattern rows that can handle it, and record
+    the confidence of the routing.
+
+    :param routes: Routes found for the query beforehand, if any
+    :type routes: Tuple
+    """
+    if routes is None:
+      routes = self.__match(query, exact_match)
+
+    confidence = routes[2][0] if len(routes[0]) > 0 else None
+    self.__stats.record_routing(confidence, confidence is not None \
+      and confidence >= self.__confidence_threshold)
+    self.__last_confidence = confidence
+    if confidence is not None:
+      print("[Inference Engine] Routed to %s with confidence %.2f" % (
+        self.__get_handler_name(routes[0][0][7]), confidence))
+
+    return routes
+
+
+  def prefetch(self, partial_query:str):
+    """
+    Route what the user has said so far, while they're still speaking.
+    If the final query turns out to be the same, `infer()` reuses this
+    routing instead of tagging and shortlisting the query again. Nothing
+    about the partial query is recorded in the stats, other than whether it
+    was reused (see `InferenceStats.record_prefetch()`), and no skills are
+    loaded for it.
+
+    :param partial_query: Partial transcript of the user's speech
+    :type partial_query: str
+    """
+    normalized_query = normalize_text(partial_query)
+    if self.__prefetched is not None \
+      and self.__prefetched[0] == normalized_query:
+      return
+
+    # The stage stats are about queries that were answered, and most partial
+    # queries never are
+    query, exact_match = self.__prepare([partial_query], record=False)[0]
+    routes = self.__match(query, exact_match, record=False)
+    self.__prefetched = (normalized_query, query, exact_match, routes)
+
+
+  def __take_prefetched(self, query:str) -> Tuple:
+    """
+    Get the `Query`, exact match and routes prefetched for a query, or
+    `None` if the latest prefetch was for something else. The prefetched
+    routing is used only once.
+    """
+    prefetched = self.__prefetched
+    self.__prefetched = None
+    if prefetched is None:
+      return None
+
+    hit = prefetched[0] == normalize_text(query)
+    self.__stats.record_prefetch(hit)
+    if not hit:
+      return None
+
+    # Same words, so the tags are the same, but the raw text may differ
+    return Query(query, list(prefetched[1].tagged)), prefetched[2], \
+      prefetched[3]
 
 
   def infer(self, query:str):
     """
     Find out what the user wants.
+    The query is normalized, tokenized and tagged once, and handed to the
+    intent handlers as a `Query`. If the query was prefetched while the
+    user was speaking, its routing is reused.
 
     :param query: User text input/query
     :type query: str
     """
-    # Tag the sentence
-    tokenized = word_tokenize(query.lower())
-    intent_tags = pos_tag(tokenized)
-    intent_syntax_query_list = []
-    for tag in intent_tags:
-      intent_syntax_query_list += [tag[1]]
-
-    # Connect to skill database
-    skill_conn = sqlite3.connect(self.__db_location)
-    db_cursor = skill_conn.cursor()
+    prefetched = self.__take_prefetched(query)
+    if prefetched is not None:
+      query, exact_match, routes = prefetched
+    else:
+      query, exact_match = self.__prepare([query])[0]
+      routes = None
+
+    # Reuse the answer if the same query was asked recently
+    cache_key = ResultCache.make_key(query)
+    cached_results = self.__result_cache.get(cache_key)
+    self.__last_handler = None
+    self.__last_confidence = None
+    if cached_results is not None:
+      print("[Inference Engine] Answered from cache (hits: %d, misses: %d)" \
+        % (self.__result_cache.hits, self.__result_cache.misses))
+      return cached_results
 
     # Get list os skills that can handle the query and the list of variables
-    short_listed_results, variables = self.__shortlist(db_cursor, tokenized,
-      intent_syntax_query_list)
+    short_listed_results, variables, confidence = self.__route(query,
+      exact_match, routes)
+
+    skill_results, cache_ttl = self.__run_handlers(query, short_listed_results,
+      variables, confidence)
+
+    # If there's no answers even from fallback intent handlers,
+    # let the user know that there's no known answers we way to
+    # handle the query
+    if len(skill_results) == 0:
+      return [{"type": "text", "value": "I am sorry, I don't know"}]
 
+    self.__result_cache.put(cache_key, skill_results, cache_ttl)
+
+    return skill_results
+
+
+  def infer_many(self, queries:List[str], execute:bool=True) -> List[Dict]:
+    """
+    Route a batch of queries, such as a replayed log of user queries, to
+    check which skills handle them. All the queries are tagged in one batch
+    and the result cache isn't used. The routing of these queries isn't
+    logged or recorded in the stats, so that replaying a log doesn't change
+    the stats of live queries. Handlers that are called still record their
+    timings.
+    Returns a dictionary for every query, with the following keys:
+    - `query`: The query
+    - `handler`: Name of the handler that answered the query, like
+      `DateTime.time_intent_handler`, or `None`. If handlers aren't
+      executed, this is the first handler that would have been tried.
+    - `candidates`: The shortlisted handlers, as a list of dictionaries with
+      the `handler` name and its routing `confidence`, between 0 and 1
+    - `results`: The answers of the skill, or `None` if handlers aren't
+      executed
+
+    :param queries: User text inputs/queries
+    :type queries: List[str]
+    :param execute: Whether to call the intent handlers, instead of only
+    finding out which ones would be called (routing only). Skills aren't
+    loaded when routing only.
+    :type execute: bool
+    """
+    answers = []
+    for (query, exact_match) in self.__prepare(queries, record=False):
+      short_listed_results, variables, confidence = self.__match(query,
+        exact_match, record=False)
+      candidates = [{ "handler": self.__get_handler_name(result[7]),
+        "confidence": value } for (result, value) \
+        in zip(short_listed_results, confidence)]
+
+      answer = { "query": query.raw, "handler": None,
+        "candidates": candidates, "results": None }
+      if not execute:
+        order = self.__get_attempt_order(short_listed_results, confidence)
+        if len(order) > 0:
+          answer["handler"] = candidates[order[0]]["handler"]
+      else:
+        self.__last_handler = None
+        skill_results, _ = self.__run_handlers(query, short_listed_results,
+          variables, confidence)
+        answer["handler"] = self.get_last_handler()
+        answer["results"] = skill_results
+      answers += [answer]
+
+    return answers
+
+
+  @staticmethod
+  def __get_handler_name(callback_id:int) -> str:
+    """
+    Get the name of an intent handler without loading its skill.
+    """
+    callback = SkillBackend.callback_list[callback_id]
+    return callback.__module__ + "." + callback.__name__
+
+
+  def __run_handlers(self, query:Query, short_listed_results:List,
+    variables:List[Dict], confidence:List[float]) -> Tuple:
+    """
+    Call the intent handlers of the shortlisted skills, and the fallback
+    intent handlers if none of them answer. If the best candidate is
+    confident enough, only its handler is called.
+    Returns a tuple of the list of answers and the number of seconds they
+    can be cached for.
+    """
     skill_results = []
+    cache_ttl = 0
 
-    i = 0
-    for result in short_listed_results:
+    # Get the intent handlers of the shortlisted skills and their inputs
+    candidates = []
+    for i in self.__get_attempt_order(short_listed_results, confidence):
+      result = short_listed_results[i]
       # syntax = result[1]
       lang = result[3]
       skill_name = result[4]
       callback_id = result[7]
       subjects = variables[i]
       context = self.__get_context(skill_name)
+      intent_handler = self.__skill_backend.get_callback(callback_id)
+      if intent_handler is None:
+        continue
+      candidates += [(callback_id, intent_handler, (subjects, context,
+        query, list(query.tagged), lang, os.path.join(
+        self.__skill_backend.plugin_directory, intent_handler.__module__)))]
+
+    # Call the skill intent handler functions and get answers
+    stage_start = time.perf_counter()
+    if self.__speculative:
+      # Network skills only run if none of the local ones before them answer
+      intent_answer = None
+      start = 0
+      while intent_answer is None and start < len(candidates):
+        end = start + 1
+        while end < len(candidates) and self.__get_cost_tier(
+          candidates[end][0]) == self.__get_cost_tier(candidates[start][0]):
+          end += 1
+        intent_answer = self.__evaluate_speculatively(candidates[start:end])
+        start = end
+    else:
+      intent_answer = self.__evaluate_sequentially(candidates)
+
+    if intent_answer is not None:
+      skill_result, callback_id, intent_handler = intent_answer
+      print(
+        f"[Inference Engine] Answered by {intent_handler.__module__} skill")
+      if skill_result["type"] == "internal-action" and \
+        not self.__skill_backend.verify_internal_intent_handler(
+          intent_handler.__name__, intent_handler.__module__):
+        return [{"type": "text", "value": \
+          "This is urgent, the skill %s is trying to access restricted areas \
+            of my system" % intent_handler.__module__}], 0
+      skill_results += [skill_result]
+      cache_ttl = SkillBackend.cache_ttl_list[callback_id]
+      self.__last_handler = intent_handler
 
-      # Call the skill intent handler function and get answers
-      intent_handler = SkillBackend.callback_list[callback_id]
-      skill_result = intent_handler(subjects, context, query.lower(),
-        intent_tags, lang, os.path.join(self.__skill_backend.plugin_directory,
-        intent_handler.__module__))
-
-      if skill_result is not None:
-        print(
-          f"[Inference Engine] Answered by {intent_handler.__module__} skill")
+    # If the query hasn't been answered or handled by any skill,
+    # Use the the fallback intent handlers and pass the whole query
+    # without any interpretation. The fallback handler must interpret
+    # such queries on their own.
+    if len(skill_results) == 0:
+      fallback_answer = self.__race_fallbacks(query)
+      if fallback_answer is not None:
+        skill_result, callback_id, intent_handler = fallback_answer
         if skill_result["type"] == "internal-action" and \
           not self.__skill_backend.verify_internal_intent_handler(
             intent_handler.__name__, intent_handler.__module__):
-          db_cursor.close()
-          skill_conn.close()
-          return [{"type": "text", "value": \
-            "This is urgent, the skill %s is trying to access restricted areas \
-              of my system" % intent_handler.__module__}]
+          return [{"type": "text", "value": "This is urgent, the skill %s \
+            is trying to access restricted areas of my system" \
+              % intent_handler.__module__}], 0
+        print("[Inference Engine] Answered by %s fallback skill" \
+          % intent_handler.__module__)
         skill_results += [skill_result]
-        break
+        cache_ttl = SkillBackend.cache_ttl_list[callback_id]
+        self.__last_handler = intent_handler
 
-      i += 1
+    self.__stats.record_stage("handlers", time.perf_counter() - stage_start)
 
-    # If the query hasn't been answered or handled by any skill,
-    # Use the the fallback intent handlers and pass the whole query
-    # without any interpretation. The fallback handler must interpret
-    # such queries on their own.
-    if len(skill_results) == 0:
-      db_cursor.execute("""
-        SELECT * FROM skills
-        WHERE fallback = 1
-      """)
-
-      fallback_skills = db_cursor.fetchall()
-
-      if len(fallback_skills) > 0:
-        for fallback_skill in fallback_skills:
-          skill_name = fallback_skill[4]
-          callback_id = fallback_skill[7]
-          intent_handler = SkillBackend.callback_list[callback_id]
-          skill_result = intent_handler(query, tokenized, os.path.join(
-            self.__skill_backend.plugin_directory, intent_handler.__module__))
-          if skill_result is not None:
-            if skill_result["type"] == "internal-action" and \
-              not self.__skill_backend.verify_internal_intent_handler(
-                intent_handler.__name__, intent_handler.__module__):
-              db_cursor.close()
-              skill_conn.close()
-              return [{"type": "text", "value": "This is urgent, the skill %s \
-                is trying to access restricted areas of my system" \
-                  % intent_handler.__module__}]
-            print("[Inference Engine] Answered by %s fallback skill" \
-              % intent_handler.__module__)
-            skill_results += [skill_result]
-            break
-
-
-    db_cursor.close()
-    skill_conn.close()
+    return skill_results, cache_ttl
 
-    # If there's no answers even from fallback intent handlers,
-    # let the user know that there's no known answers we way to
-    # handle the query
-    if len(skill_results) == 0:
-      return [{"type": "text", "value": "I am sorry, I don't know"}]
 
+  def __get_cost_tier(self, callback_id:int) -> int:
+    """
+    Get the cost tier of an intent handler, `0` for local and `1` for
+    network. The measured cost of the skill is used once it has been called
+    enough times, otherwise the cost class declared by the skill.
+    """
+    callback = SkillBackend.callback_list[callback_id]
+    cost_ms, samples = self.__stats.get_skill_cost(callback.__module__)
+    if samples >= InferenceEngine.MIN_COST_SAMPLES:
+      return 0 if cost_ms <= InferenceEngine.LOCAL_COST_MS else 1
+
+    return 0 if SkillBackend.cost_list[callback_id] \
+      == SkillBackend.COST_LOCAL else 1
 
-    return skill_results
+
+  def __order_by_cost(self, short_listed_results:List,
+    confidence:List[float]) -> List[int]:
+    """
+    Get the order in which the shortlisted intent handlers are tried.
+    Candidates that match about as well as the most confident one are tried
+    cheapest first, followed by the rest in their ranked order.
+    """
+    if len(short_listed_results) == 0:
+      return []
+
+    best_confidence = max(confidence)
+    return sorted(range(len(short_listed_results)), key=lambda i: (
+      0 if best_confidence - confidence[i] \
+        <= InferenceEngine.COST_CONFIDENCE_MARGIN else 1,
+      self.__get_cost_tier(short_listed_results[i][7]), i))
+
+
+  def __get_attempt_order(self, short_listed_results:List,
+    confidence:List[float]) -> List[int]:
+    """
+    Get the indices of the shortlisted intent handlers that are tried, in
+    the order they are tried. If the best candidate is confident enough, it's
+    the only one.
+    """
+    if len(confidence) > 0 and confidence[0] >= self.__confidence_threshold:
+      return [0]
+
+    return self.__order_by_cost(short_listed_results, confidence)
+
+
+  def __evaluate_sequentially(self, candidates:List):
+    """
+    Call the intent handlers one by one, in the order they are ranked,
+    until one of them answers.
+    Returns a tuple of the answer, the callback ID and the intent handler,
+    or `None` if none of the handlers could answer.
+    """
+    for (callback_id, intent_handler, args) in candidates:
+      if inspect.iscoroutinefunction(intent_handler):
+        skill_result = self.__submit("intent", intent_handler, args).result()
+      else:
+        skill_result = self.__timed_call("intent", intent_handler, args)
+      if skill_result is not None:
+        return (skill_result, callback_id, intent_handler)
+
+    return None
+
+
+  def __evaluate_speculatively(self, candidates:List):
+    """
+    Call all the intent handlers at once, and get the answer of the highest
+    ranked one that answers. The answer is the same as the one from
+    `__evaluate_sequentially()`, but the wait is only as long as the slowest
+    handler that has to be considered rather than the sum of all of them.
+    """
+    running_handlers = [(callback_id, intent_handler,
+      self.__submit("intent", intent_handler, args)) \
+        for (callback_id, intent_handler, args) in candidates]
+
+    return self.__first_answer(running_handlers)
+
+
+  def __race_fallbacks(self, query:Query):
+    """
+    Run all the fallback intent handlers concurrently and get the answer of
+    the first one, in registration order, that answers within the deadline.
+    Coroutine handlers are cancelled at the deadline, while regular ones are
+    left to finish in the fallback thread pool (see `MAX_FALLBACK_WORKERS`).
+    """
+    running_handlers = []
+    for fallback_skill in self.__intent_matcher.fallback_rows:
+      callback_id = fallback_skill[7]
+      intent_handler = self.__skill_backend.get_callback(callback_id)
+      if intent_handler is None:
+        continue
+      future = self.__submit("fallback", intent_handler, (query,
+        list(query.tokens), os.path.join(self.__skill_backend.plugin_directory,
+        intent_handler.__module__)), self.__fallback_timeout)
+      running_handlers += [(callback_id, intent_handler, future)]
+
+    return self.__first_answer(running_handlers,
+      time.monotonic() + self.__fallback_timeout)
+
+
+  def __submit(self, kind:str, intent_handler, args:Tuple,
+    timeout:float=None) -> concurrent.futures.Future:
+    """
+    Start running an intent handler in the background.
+    Coroutine (`async def`) handlers are run on the event loop, if there's
+    one, and regular handlers in the thread pool (fallbacks in their own).
+
+    :param timeout: Number of seconds after which a coroutine handler is
+    cancelled, or `None` to let it run until it's done
+    :type timeout: float
+    """
+    executor = self.__fallback_executor if kind == "fallback" \
+      else self.__executor
+    if inspect.iscoroutinefunction(intent_handler):
+      coroutine = self.__timed_call_async(kind, intent_handler, args, timeout)
+      if self.__event_loop is not None:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__event_loop)
+      future = executor.submit(asyncio.run, coroutine)
+      # A coroutine that is cancelled before it starts has to be closed
+      future.add_done_callback(lambda done: coroutine.close() \
+        if done.cancelled() else None)
+      return future
+
+    return executor.submit(self.__timed_call, kind, intent_handler, args)
+
+
+  def __timed_call(self, kind:str, intent_handler, args:Tuple):
+    """
+    Call an intent handler and record how it went.
+    """
+    name = intent_handler.__module__ + "." + intent_handler.__name__
+    start = time.perf_counter()
+    try:
+      skill_result = intent_handler(*args)
+    except Exception:
+      self.__stats.record_handler(kind, name, time.perf_counter() - start,
+        False, True)
+      raise
+
+    self.__stats.record_handler(kind, name, time.perf_counter() - start,
+      skill_result is not None)
+    return skill_result
+
+
+  async def __timed_call_async(self, kind:str, intent_handler, args:Tuple,
+    timeout:float=None):
+    """
+    Await a coroutine intent handler and record how it went. Without an
+    event loop, the handler runs in a thread of the pool, which cancelling
+    its future doesn't stop, so it's cancelled here after the timeout.
+    """
+    name = intent_handler.__module__ + "." + intent_handler.__name__
+    start = time.perf_counter()
+    try:
+      skill_result = await asyncio.wait_for(intent_handler(*args), timeout)
+    except Exception:
+      self.__stats.record_handler(kind, name, time.perf_counter() - start,
+        False, True)
+      raise
+
+    self.__stats.record_handler(kind, name, time.perf_counter() - start,
+      skill_result is not None)
+    return skill_result
+
+
+  def __first_answer(self, running_handlers:List, deadline:float=None):
+    """
+    Wait for the handlers running in the thread pool, in the given order,
+    and get the first answer. Handlers that fail or don't answer before the
+    deadline are skipped.
+    Returns a tuple of the answer, the callback ID and the intent handler,
+    or `None` if none of the handlers could answer.
+    """
+    answer = None
+    for (callback_id, intent_handler, future) in running_handlers:
+      # Whatever is left is either cancelled if it hasn't started yet,
+      # or left to finish on its own and ignored
+      if answer is not None:
+        future.cancel()
+        continue
+
+      try:
+        skill_result = future.result(timeout=None if deadline is None \
+          else max(0, deadline - time.monotonic()))
+      except concurrent.futures.TimeoutError:
+        print("[Inference Engine] %s skill timed out" \
+          % intent_handler.__module__)
+        future.cancel()
+        continue
+      except Exception as e:
+        print("[Inference Engine] %s skill failed:" \
+          % intent_handler.__module__, e)
+        continue
+
+      if skill_result is not None:
+        answer = (skill_result, callback_id, intent_handler)
+
+    return answer
+
+
+  def get_stats(self) -> InferenceStats:
+    """
+    Get the latency and outcome stats of the inference pipeline and skills.
+    """
+    return self.__stats
+
+
+  def get_last_handler(self) -> str:
+    """
+    Get the name of the handler that answered the last query, like
+    `DateTime.time_intent_handler`. This is `None` if no skill could answer
+    or if the answer came from the cache.
+    """
+    if self.__last_handler is None:
+      return None
+
+    return self.__last_handler.__module__ + "." + self.__last_handler.__name__
+
+
+  def get_last_confidence(self) -> float:
+    """
+    Get the routing confidence, between 0 and 1, of the best candidate for
+    the last query. This is `None` if no intent matched the query or if the
+    answer came from the cache.
+    """
+    return self.__last_confidence
+
+
+  def clear_cache(self):
+    """
+    Forget the answers to recent queries.
+    """
+    self.__result_cache.clear()
+
+
+  def get_cache_stats(self) -> Dict:
+    """
+    Get the hit and miss counters of the result cache.
+    """
+    return self.__result_cache.get_stats()
 
 
-  def __get_context(self, skill_name:str) -> Dict:
+  def __get_context(self, skill_name:str) -> ContextNamespace:
     """
-    Get the context dictionary associated with a given skill.
+    Get the context namespace associated with a given skill.
     Context can be used by certain queries involving pronouns
     to implicitly assume the subject.
 
     :param skill_name: Name of skill
     :type skill_name: str
     """
-    return {key.replace(skill_name + "+", ""): value for (key, value) \
-      in SkillBackend.context_dict.items() if key.startswith(skill_name)}
+    return SkillBackend.context_store.get_namespace(skill_name)
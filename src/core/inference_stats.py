@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the inference stats collector, which records how long every
+stage of answering a query takes and how every skill handler performs, so that
+it's possible to tell which skill makes a query slow.
+"""
+
+# Base imports
+import json
+import threading
+from typing import Dict, Tuple
+
+#--------------CLASS-SEPARATOR---------------#
+
+class InferenceStats():
+  """
+  ## Inference Stats
+  Collects latency histograms of the stages of the inference
+  pipeline (tokenization, tagging, shortlisting, handler
+  execution and result rendering), and the call count,
+  None-rate and latency histogram of every intent handler,
+  fallback handler and internal action.
+
+  The routing confidence of every query is also recorded in
+  a histogram, along with how often it was high enough to
+  skip the other candidates.
+
+  The cost of every skill is tracked as a moving average
+  of the time taken by its handlers, and queries that were
+  routed from a partial transcript are counted.
+
+  Handlers may run in other threads, so recording is
+  thread-safe.
+  """
+
+  # Upper bounds of the latency histogram buckets in milliseconds.
+  # Anything slower goes into an extra overflow bucket.
+  BUCKETS_MS = [1, 5, 10, 50, 100, 500, 1000, 5000, 20000]
+
+  # Upper bounds of the routing confidence histogram buckets
+  CONFIDENCE_BUCKETS = [0.2, 0.4, 0.6, 0.8, 0.9, 1.0]
+
+  # Weight of the latest sample in the moving average of skill costs
+  COST_SMOOTHING = 0.3
+
+  def __init__(self):
+    self.__lock = threading.Lock()
+    self.__stages = {}
+    self.__handlers = {}
+    self.__routing = InferenceStats.__new_routing_entry()
+    self.__skill_costs = {}
+    self.__prefetch = { "count": 0, "hits": 0 }
+
+
+  @staticmethod
+  def __new_entry() -> Dict:
+    return {
+      "count": 0,
+      "total_ms": 0.0,
+      "max_ms": 0.0,
+      "histogram": [0] * (len(InferenceStats.BUCKETS_MS) + 1)
+    }
+
+
+  @staticmethod
+  def __new_routing_entry() -> Dict:
+    return {
+      "count": 0,
+      "unrouted": 0,
+      "early_exits": 0,
+      "total_confidence": 0.0,
+      "histogram": [0] * len(InferenceStats.CONFIDENCE_BUCKETS)
+    }
+
+
+  @staticmethod
+  def __add_sample(entry:Dict, seconds:float):
+    milliseconds = seconds * 1000
+    entry["count"] += 1
+    entry["total_ms"] += milliseconds
+    entry["max_ms"] = max(entry["max_ms"], milliseconds)
+    bucket = 0
+    while bucket < len(InferenceStats.BUCKETS_MS) \
+      and milliseconds > InferenceStats.BUCKETS_MS[bucket]:
+      bucket += 1
+    entry["histogram"][bucket] += 1
+
+
+  def record_stage(self, stage:str, seconds:float):
+    """
+    Record the time spent in a stage of the inference pipeline.
+
+    :param stage: Name of the stage, like `tagging`
+    :type stage: str
+    :param seconds: Time spent in seconds
+    :type seconds: float
+    """
+    with self.__lock:
+      if stage not in self.__stages:
+        self.__stages[stage] = InferenceStats.__new_entry()
+      InferenceStats.__add_sample(self.__stages[stage], seconds)
+
+
+  def record_handler(self, kind:str, name:str, seconds:float,
+    answered:bool, failed:bool=False):
+    """
+    Record a call to a skill handler.
+
+    :param kind: One of `intent`, `fallback` or `internal-action`
+    :type kind: str
+    :param name: Name of the handler, like `DateTime.time_intent_handler`
+    :type name: str
+    :param seconds: Time taken by the handler in seconds
+    :type seconds: float
+    :param answered: Whether the handler returned something other than `None`
+    :type answered: bool
+    :param failed: Whether the handler raised an exception
+    :type failed: bool
+    """
+    key = kind + ":" + name
+    with self.__lock:
+      if key not in self.__handlers:
+        self.__handlers[key] = InferenceStats.__new_entry()
+        self.__handlers[key].update({ "kind": kind, "name": name,
+          "none": 0, "failed": 0 })
+      entry = self.__handlers[key]
+      InferenceStats.__add_sample(entry, seconds)
+      if not answered:
+        entry["none"] += 1
+      if failed:
+        entry["failed"] += 1
+
+      # Internal actions are run by the core loop, so they aren't skills
+      if kind != "internal-action":
+        skill = name.split(".")[0]
+        cost_ms, samples = self.__skill_costs.get(skill,
+          (seconds * 1000, 0))
+        self.__skill_costs[skill] = (cost_ms + InferenceStats.COST_SMOOTHING \
+          * (seconds * 1000 - cost_ms), samples + 1)
+
+
+  def get_skill_cost(self, skill:str) -> Tuple[float, int]:
+    """
+    Get the moving average of the time taken by the handlers of a skill in
+    milliseconds, along with the number of calls it's based on.
+
+    :param skill: Name of the skill module, like `DateTime`
+    :type skill: str
+    """
+    with self.__lock:
+      return self.__skill_costs.get(skill, (0.0, 0))
+
+
+  def record_routing(self, confidence:float, early_exit:bool):
+    """
+    Record the confidence of the best candidate for a query.
+
+    :param confidence: Confidence between 0 and 1, or `None` if no intent
+    matched the query
+    :type confidence: float
+    :param early_exit: Whether the confidence was high enough to skip the
+    other candidates and the fallbacks
+    :type early_exit: bool
+    """
+    with self.__lock:
+      entry = self.__routing
+      entry["count"] += 1
+      if confidence is None:
+        entry["unrouted"] += 1
+        return
+      entry["total_confidence"] += confidence
+      bucket = 0
+      while bucket < len(InferenceStats.CONFIDENCE_BUCKETS) - 1 \
+        and confidence > InferenceStats.CONFIDENCE_BUCKETS[bucket]:
+        bucket += 1
+      entry["histogram"][bucket] += 1
+      if early_exit:
+        entry["early_exits"] += 1
+
+
+  def record_prefetch(self, hit:bool):
+    """
+    Record whether the routing prefetched from a partial transcript could be
+    reused for the final query.
+
+    :param hit: Whether the final query matched the prefetched one
+    :type hit: bool
+    """
+    with self.__lock:
+      self.__prefetch["count"] += 1
+      if hit:
+        self.__prefetch["hits"] += 1
+
+
+  def get_summary(self) -> Dict:
+    """
+    Get a machine-readable copy of all the stats.
+    """
+    with self.__lock:
+      stages = { stage: dict(entry, histogram=list(entry["histogram"])) \
+        for (stage, entry) in self.__stages.items() }
+      handlers = [dict(entry, histogram=list(entry["histogram"])) \
+        for entry in self.__handlers.values()]
+      routing = dict(self.__routing, histogram=list(
+        self.__routing["histogram"]))
+      skill_costs = { skill: { "cost_ms": cost_ms, "count": samples } \
+        for (skill, (cost_ms, samples)) in self.__skill_costs.items() }
+      prefetch = dict(self.__prefetch)
+
+    for entry in list(stages.values()) + handlers:
+      entry["mean_ms"] = entry["total_ms"] / entry["count"]
+    for entry in handlers:
+      entry["none_rate"] = entry["none"] / entry["count"]
+    routed = routing["count"] - routing["unrouted"]
+    routing["mean_confidence"] = routing["total_confidence"] / routed \
+      if routed > 0 else 0.0
+    prefetch["hit_rate"] = prefetch["hits"] / prefetch["count"] \
+      if prefetch["count"] > 0 else 0.0
+
+    return {
+      "buckets_ms": InferenceStats.BUCKETS_MS,
+      "confidence_buckets": InferenceStats.CONFIDENCE_BUCKETS,
+      "stages": stages,
+      "routing": routing,
+      "skill_costs": skill_costs,
+      "prefetch": prefetch,
+      "handlers": sorted(handlers, key=lambda entry: entry["total_ms"],
+        reverse=True)
+    }
+
+
+  def dump(self, path:str, extra:Dict=None):
+    """
+    Write the stats to a JSON file.
+
+    :param path: Path of the file
+    :type path: str
+    :param extra: Other stats to be saved along with these
+    """
+    summary = self.get_summary()
+    if extra is not None:
+      summary.update(extra)
+
+    with open(path, "w", encoding="utf-8") as stats_file:
+      json.dump(summary, stats_file, indent=2)
+
+
+  def get_report(self) -> str:
+    """
+    Get a short human readable report of the stats.
+    """
+    summary = self.get_summary()
+    lines = []
+    for (stage, entry) in summary["stages"].items():
+      lines += ["%s: %.1f ms avg over %d" % (stage, entry["mean_ms"],
+        entry["count"])]
+
+    routing = summary["routing"]
+    if routing["count"] > 0:
+      lines += ["routing: %.2f avg confidence, %d early exits over %d" % (
+        routing["mean_confidence"], routing["early_exits"],
+        routing["count"])]
+
+    prefetch = summary["prefetch"]
+    if prefetch["count"] > 0:
+      lines += ["prefetched routing: reused for %d of %d queries" % (
+        prefetch["hits"], prefetch["count"])]
+
+    for entry in summary["handlers"][:5]:
+      lines += ["%s (%s): %d calls, %.0f%% none, %.1f ms avg" % (
+        entry["name"], entry["kind"], entry["count"],
+        entry["none_rate"] * 100, entry["mean_ms"])]
+
+    if len(lines) == 0:
+      return "No queries yet"
+
+    return "\n".join(lines)
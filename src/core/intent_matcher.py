@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the intent matcher, which is an in-memory copy of the skills
+database compiled for fast matching. Every registered intent pattern is a row
+of slots, where each slot has a set of possible words and a set of possible
+POS tags (see `pattern_compiler.py`). The slots are indexed by word and by tag,
+so finding the patterns that roughly match a given query, and scoring them, is
+done for all the patterns at once with NumPy instead of one database scan per
+tag prefix.
+
+Sentences that patterns without variables can produce are also kept in a hash
+map, so that such queries are matched without tokenizing or tagging them.
+"""
+
+# Base imports
+import json
+import sqlite3
+import numpy
+from typing import List, Dict, Tuple
+
+# Gandiva imports
+from query import normalize_text
+
+#--------------CLASS-SEPARATOR---------------#
+
+class IntentMatcher():
+  """
+  ## Intent Matcher
+  Compiles the skills table into an index of which pattern
+  slots accept every word and every POS tag.
+
+  For a query, this gives a matrix of which slots of every
+  pattern accept the word (or tag) at each position of the
+  query, so matching and scoring are a single NumPy pass.
+  Variable slots like `{subject}` accept any word.
+
+  Fixed sentences are looked up directly by their normalized
+  text, which also gives their precomputed tags.
+  """
+
+  # Highest score a word of the query can get, when both the word and the
+  # tag match. Variables only match on the tag.
+  MAX_WORD_SCORE = 3
+  MAX_VARIABLE_SCORE = 1
+
+  def __init__(self):
+    # Rows of the skills table, in the same order as the matrices
+    self.rows = []
+
+    # Rows of skills registered as fallback, in registration order
+    self.fallback_rows = []
+
+    self.__word_slots = {}
+    self.__tag_slots = {}
+    self.__prefix_tags = {}
+    self.__exact_sentences = {}
+    self.__lengths = numpy.zeros(0, dtype=numpy.int32)
+    self.__variable_mask = numpy.zeros((0, 0), dtype=bool)
+    self.__variable_slots = []
+
+
+  def compile(self, db_location:str):
+    """
+    (Re)Build the slot index from the skills database.
+    This should be called every time the skills are scanned.
+
+    :param db_location: Path to the skills database
+    :type db_location: str
+    """
+    skill_conn = sqlite3.connect(db_location)
+    db_cursor = skill_conn.cursor()
+    # Reused intents keep their old IDs, so sort them in registration order
+    db_cursor.execute("SELECT * FROM skills ORDER BY callback_id, id")
+    db_rows = db_cursor.fetchall()
+    db_cursor.close()
+    skill_conn.close()
+
+    self.rows = []
+    self.fallback_rows = []
+    self.__prefix_tags = {}
+    self.__exact_sentences = {}
+    self.__variable_slots = []
+
+    word_slots = {}
+    tag_slots = {}
+    lengths = []
+    for row in db_rows:
+      if row[6] == 1:
+        self.fallback_rows += [row]
+        continue
+
+      index = len(self.rows)
+      self.rows += [row]
+      slot_words = row[2].split(" ")
+      lengths += [len(slot_words)]
+
+      variables = []
+      for (position, words) in enumerate(slot_words):
+        # Variables are enclosed within flower brackets
+        if words.startswith("{") and words.endswith("}"):
+          variables += [(position, words[1:-1])]
+          continue
+        for word in words.split("|"):
+          word_slots.setdefault(word, []).append((index, position))
+      self.__variable_slots += [variables]
+
+      for (position, tags) in enumerate(row[1].split(" ")):
+        for tag in tags.split("|"):
+          tag_slots.setdefault(tag, []).append((index, position))
+
+      # The first registered intent wins if a sentence is registered twice
+      for (sentence, tagged) in json.loads(row[9]):
+        self.__exact_sentences.setdefault(sentence, (index,
+          [tuple(pair) for pair in tagged]))
+
+    self.__word_slots = IntentMatcher.__freeze(word_slots)
+    self.__tag_slots = IntentMatcher.__freeze(tag_slots)
+    self.__lengths = numpy.array(lengths, dtype=numpy.int32)
+    self.__variable_mask = numpy.zeros((len(self.rows), max(lengths,
+      default=0)), dtype=bool)
+    for (index, variables) in enumerate(self.__variable_slots):
+      for (position, _) in variables:
+        self.__variable_mask[index, position] = True
+
+    print("[IntentMatcher] Compiled %d intent patterns, %d fixed sentences" \
+      % (len(self.rows), len(self.__exact_sentences)), "and %d fallbacks" \
+      % len(self.fallback_rows))
+
+
+  @staticmethod
+  def __freeze(slots:Dict) -> Dict:
+    """
+    Convert lists of `(row, position)` pairs into a pair of NumPy arrays.
+    """
+    return { key: (numpy.array([index for (index, _) in pairs],
+      dtype=numpy.int64), numpy.array([position for (_, position) in pairs],
+      dtype=numpy.int64)) for (key, pairs) in slots.items() }
+
+
+  def __accepts(self, slots:Dict, keys:List[List[str]]) -> numpy.ndarray:
+    """
+    Get a boolean matrix of which slot of every row accepts any of the given
+    keys at each position.
+    """
+    accepted = numpy.zeros((len(self.rows), len(keys)), dtype=bool)
+    for (position, position_keys) in enumerate(keys):
+      for key in position_keys:
+        if key in slots:
+          indices, positions = slots[key]
+          accepted[indices[positions == position], position] = True
+
+    return accepted
+
+
+  def __get_prefix_tags(self, tag:str) -> List[str]:
+    """
+    Get the tags in the index which start with the given tag.
+    """
+    if tag not in self.__prefix_tags:
+      self.__prefix_tags[tag] = [known_tag for known_tag in self.__tag_slots \
+        if known_tag.startswith(tag)]
+
+    return self.__prefix_tags[tag]
+
+
+  def match_sentence(self, query:str):
+    """
+    Look up a query among the fixed sentences of the intent patterns.
+    Returns a tuple of the index of the matching pattern and the
+    `(token, tag)` pairs of the sentence, or `None` if there's no such
+    sentence.
+
+    :param query: User text input/query
+    :type query: str
+    """
+    return self.__exact_sentences.get(normalize_text(query))
+
+
+  def match(self, tags:List[str]) -> numpy.ndarray:
+    """
+    Get the indices of the largest set of intent patterns whose structure
+    roughly matches the given POS tag sequence.
+
+    The sentence structure considered for matching is gradually increased,
+    and the last non-empty set is returned. As with an SQL `LIKE 'tags%'`
+    scan, the last tag in the considered structure only needs to be a
+    prefix of the intent's tag (so `NN` also matches `NNS` and `NNP`).
+
+    :param tags: POS tags of the query
+    :type tags: List[str]
+    """
+    if len(tags) == 0 or len(self.rows) == 0:
+      return numpy.zeros(0, dtype=numpy.int64)
+
+    exact = self.__accepts(self.__tag_slots, [[tag] for tag in tags[:-1]])
+    prefix = self.__accepts(self.__tag_slots,
+      [self.__get_prefix_tags(tag) for tag in tags[:-1]])
+
+    largest_matching_indices = numpy.arange(len(self.rows))
+    matching = numpy.ones(len(self.rows), dtype=bool)
+    for i in range(len(tags) - 1):
+      indices = numpy.flatnonzero(matching & prefix[:, i])
+      if len(indices) == 0:
+        # At this point we have exceeded the max length that could be matched
+        break
+      largest_matching_indices = indices
+      matching &= exact[:, i]
+
+    return largest_matching_indices
+
+
+  def score(self, indices:numpy.ndarray, tokens:List[str],
+    tags:List[str]) -> numpy.ndarray:
+    """
+    Score the given intent patterns against the query.
+    Every matching word is worth 2 points and every matching tag 1 point,
+    while every mismatching word (that isn't a variable) costs 1 point.
+
+    :param indices: Indices of the intent patterns, as returned by `match()`
+    :param tokens: Tokens of the query
+    :type tokens: List[str]
+    :param tags: POS tags of the query
+    :type tags: List[str]
+    """
+    k = min(len(tokens), self.__variable_mask.shape[1])
+    word_matches = self.__accepts(self.__word_slots,
+      [[token] for token in tokens[:k]])[indices]
+    tag_matches = self.__accepts(self.__tag_slots,
+      [[tag] for tag in tags[:k]])[indices]
+
+    valid = numpy.arange(k) < self.__lengths[indices][:, None]
+    word_mismatches = valid & ~word_matches \
+      & ~self.__variable_mask[indices, :k]
+
+    return 2 * word_matches.sum(axis=1) - word_mismatches.sum(axis=1) \
+      + tag_matches.sum(axis=1)
+
+
+  def get_confidence(self, indices:numpy.ndarray, scores:numpy.ndarray,
+    tokens:List[str]) -> numpy.ndarray:
+    """
+    Normalize scores given by `score()` to a confidence between 0 and 1, where
+    1 means that the query has as many words as the intent pattern and every
+    word and every tag matched.
+
+    :param indices: Indices of the intent patterns, as returned by `match()`
+    :param scores: Scores of the intent patterns
+    :param tokens: Tokens of the query
+    :type tokens: List[str]
+    """
+    lengths = self.__lengths[indices]
+    variables = self.__variable_mask[indices].sum(axis=1)
+    max_scores = IntentMatcher.MAX_WORD_SCORE * (lengths - variables) \
+      + IntentMatcher.MAX_VARIABLE_SCORE * variables \
+      + IntentMatcher.MAX_WORD_SCORE * numpy.maximum(len(tokens) - lengths, 0)
+
+    return numpy.clip(scores / numpy.maximum(max_scores, 1), 0, 1)
+
+
+  def shortlist(self, tokens:List[str], tags:List[str],
+    limit:int=3) -> Tuple[List[int], List[float]]:
+    """
+    Get the intent patterns that best match a query, as the indices of their
+    rows and their confidence, with the most confident one first.
+
+    The patterns with the highest scores are shortlisted, but scores of
+    patterns of different lengths don't compare, so the shortlist is ranked
+    by confidence.
+
+    :param tokens: Tokens of the query
+    :type tokens: List[str]
+    :param tags: POS tags of the query
+    :type tags: List[str]
+    :param limit: Max number of patterns in the shortlist
+    :type limit: int
+    """
+    # Perform a blanket scan by gradually increasing the length of sentence
+    # structure considered for matching. This gives a big list of all skills
+    # whose "intent"s match the given query roughly
+    indices = self.match(tags)
+
+    # Match the inidivdual words to and give the skills a score based on the
+    # most number of matches
+    scores = self.score(indices, tokens, tags)
+
+    # Get the skills with the highest score. The score must be more than the
+    # number of words in the query for it to be considered valid
+    n = len(tokens)
+    short_listed = [i for i \
+      in numpy.argsort(-scores, kind="stable")[:limit] if scores[i] > n]
+
+    confidence = self.get_confidence(indices, scores, tokens)
+    short_listed = sorted(short_listed, key=lambda i: -confidence[i])
+
+    return [int(indices[i]) for i in short_listed], [float(confidence[i]) \
+      for i in short_listed]
+
+
+  def get_variables(self, index:int, tokens:List[str]) -> Dict:
+    """
+    Get the words in the query which fill in the variables of an intent
+    pattern.
+
+    :param index: Index of the intent pattern
+    :type index: int
+    :param tokens: Tokens of the query
+    :type tokens: List[str]
+    """
+    return { name: tokens[position] for (position, name) \
+      in self.__variable_slots[index] if position < len(tokens) }
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the model registry, which loads every _vosk_ speech model only
+once, so that the speech-to-text system and the wakeword engine share the same
+model in memory instead of loading a copy each. Each of them still creates its
+own recognizer from the shared model.
+
+It also tells the sample rate a model works at, so that audio can be captured
+at that rate instead of being resampled by _vosk_ on every frame.
+"""
+
+# Base imports
+import os
+import threading
+from vosk import Model
+
+# Gandiva imports
+from config import constants
+
+#--------------CLASS-SEPARATOR---------------#
+
+class ModelRegistry():
+  """
+  ## Model Registry
+  Loads speech models on first use and keeps them for the
+  rest of the session. Loading is thread-safe, and a model
+  that is being loaded by one thread is waited for by the
+  others instead of being loaded again.
+  """
+
+  # Speech model used for speech-to-text and wakeword detection
+  SPEECH_MODEL = "vosk-model-small-en-us-0.15"
+
+  # Sample rate of models that don't mention it in their feature config
+  DEFAULT_SAMPLE_RATE = 16000
+
+  __models = {}
+  __sample_rates = {}
+  __locks = {}
+  __lock = threading.Lock()
+
+  @staticmethod
+  def get_model_location(name:str) -> str:
+    """
+    Get the path of an installed speech model.
+
+    :param name: Name of the model folder
+    :type name: str
+    """
+    return os.path.join(constants.DATA_PATH, "SpeechRecognitionModels", name)
+
+
+  @staticmethod
+  def get_sample_rate(name:str=SPEECH_MODEL) -> int:
+    """
+    Get the sample rate that a speech model was trained at, from the
+    `--sample-frequency` option of its feature config (`conf/mfcc.conf`).
+
+    :param name: Name of the model folder
+    :type name: str
+    """
+    sample_rate = ModelRegistry.__sample_rates.get(name)
+    if sample_rate is not None:
+      return sample_rate
+
+    sample_rate = ModelRegistry.DEFAULT_SAMPLE_RATE
+    try:
+      with open(os.path.join(ModelRegistry.get_model_location(name), "conf",
+        "mfcc.conf"), encoding="utf-8") as config_file:
+        for line in config_file:
+          if line.strip().startswith("--sample-frequency="):
+            sample_rate = int(float(line.strip().split("=")[1]))
+    except (OSError, ValueError) as error:
+      print("[ModelRegistry] Couldn't read the sample rate of", name, error)
+
+    ModelRegistry.__sample_rates[name] = sample_rate
+    return sample_rate
+
+
+  @staticmethod
+  def get_model(name:str=SPEECH_MODEL) -> Model:
+    """
+    Get a speech model, loading it if it hasn't been loaded yet.
+
+    :param name: Name of the model folder
+    :type name: str
+    """
+    model = ModelRegistry.__models.get(name)
+    if model is not None:
+      return model
+
+    with ModelRegistry.__lock:
+      model_lock = ModelRegistry.__locks.setdefault(name, threading.Lock())
+
+    with model_lock:
+      model = ModelRegistry.__models.get(name)
+      if model is None:
+        print("[ModelRegistry] Loading speech model", name)
+        model = Model(ModelRegistry.get_model_location(name))
+        ModelRegistry.__models[name] = model
+
+    return model
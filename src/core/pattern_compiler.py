@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the pattern compiler, which compiles the patterns of an intent
+into a compact grammar. Every pattern becomes a sequence of slots, where each
+slot holds the set of words that may appear there (or a variable) along with
+the set of syntax (POS tags) those words take. The alternatives of a pattern
+are never expanded into every possible sentence, so a pattern with many
+alternatives costs about as much as a pattern with none.
+
+Compiling is the slow part of registering skills, so the skill backend runs it
+in worker processes when there are a lot of patterns. It only depends on NLTK
+(and the tagger service), so that the workers don't have to load the rest of
+the app. Every worker keeps its own tagger service, so sentences shared by
+several intents are tagged once.
+
+Patterns without variables also give the exact sentences they can produce,
+along with their tags, so that such queries can be answered without tagging.
+"""
+
+# Base imports
+import re
+import itertools
+from typing import List, Tuple
+
+from nltk import data
+from nltk.tokenize import word_tokenize
+
+# Gandiva imports
+from tagger_service import TaggerService
+
+# Version of the compiled grammar format. Intents compiled with an older
+# version are compiled again.
+COMPILER_VERSION = 3
+
+# Patterns that can produce more sentences than this don't get exact sentences
+MAX_EXACT_SENTENCES = 64
+
+# Tagger used when compiling in this process
+_tagger = TaggerService()
+
+
+def parse_pattern(pattern:str) -> List[Tuple]:
+  """
+  Split a pattern into slots. Each slot is a tuple of the possible words and
+  the name of the variable, if the slot is a variable.
+  """
+  slots = []
+  for token in pattern.split(" "):
+    # If the token is an array of possible words
+    if re.search(r"^\[.*\]$", token) is not None:
+      sub_tokens = token.replace("[", "").replace("]", "").split(",")
+      slots += [(sub_tokens, None)]
+    # If the token is a variable
+    elif re.search(r"^{.*}$", token) is not None:
+      sub_tokens = token.replace("{", "").replace("}", "").split(",")
+      # First item is always the token name
+      variable = sub_tokens[0]
+      # the other ones represent the possible tags
+      tags = sub_tokens[1:]
+      if len(tags) == 0:
+        print("[SkillBackend] Intent Error: Speech tags not associated \
+          with variable <" + variable + ">")
+        break
+      possible_words = []
+      # Temporarily substitute the variables to facilitate pos tagging
+      for tag in tags:
+        if tag == "JJ": # Adjective
+          possible_words += ["nice"]
+        elif tag == "RB": # Adverb
+          possible_words += ["nicely"]
+        elif tag == "VB": # Adverb
+          possible_words += ["do"]
+        else: # Probably noun
+          possible_words += ["Amanda"]
+      slots += [(possible_words, variable)]
+    else:
+      slots += [([token], None)]
+
+  return slots
+
+
+def count_alternatives(patterns:List[str]) -> int:
+  """
+  Get the total number of words in the slots of some patterns, which is about
+  the number of sentences that have to be tagged to compile them.
+  """
+  return sum([len(words) for pattern in patterns \
+    for (words, _) in parse_pattern(pattern)])
+
+
+def compile_patterns(patterns:List[str], nltk_data_path:List[str]=None,
+  tagger:TaggerService=None):
+  """
+  Compile the patterns of an intent into grammar rows.
+  In a row, slots are separated by spaces and the alternatives within a slot
+  by `|`, so `[what,who] is {subject,NN}` gives the syntax `WP VBZ NN` and
+  the sentence `what|who is {subject}`.
+
+  The words of a slot usually tokenize into the same number of tokens, so a
+  pattern gives a single row. Otherwise, the words are grouped by their number
+  of tokens and each combination of groups gets its own row.
+
+  Rows without variables also get a list of the sentences they can produce,
+  each as a pair of the normalized sentence and its `(token, tag)` pairs.
+
+  :param patterns: Patterns of an intent
+  :type patterns: List[str]
+  :param nltk_data_path: Paths where the NLTK data is installed, needed when
+  running in a worker process
+  :type nltk_data_path: List[str]
+  :param tagger: Tagger service to use, instead of the one of this process
+  :type tagger: TaggerService
+  :return: The syntax, sentence and exact sentences of every row
+  """
+  if nltk_data_path is not None:
+    data.path = nltk_data_path
+  if tagger is None:
+    tagger = _tagger
+
+  syntax_list = []
+  converted_sentences = []
+  exact_sentences = []
+  for pattern in patterns:
+    slot_groups = []
+    for (words, variable) in parse_pattern(pattern):
+      groups = {}
+      for word in words:
+        tokens = word_tokenize(word)
+        groups.setdefault(len(tokens), []).append((word, tokens))
+      slot_groups += [[(group, variable) for group in groups.values()]]
+
+    for slots in itertools.product(*slot_groups):
+      syntax, sentence, exact = _compile_row(list(slots), tagger)
+      syntax_list += [syntax]
+      converted_sentences += [sentence]
+      exact_sentences += [exact]
+
+  return syntax_list, converted_sentences, exact_sentences
+
+
+def _compile_row(slots:List[Tuple], tagger:TaggerService):
+  """
+  Find the tags of every position of a row, by swapping in every word of each
+  slot in turn while the other slots keep their first word. All the swapped
+  sentences of the row are tagged in one batch.
+  """
+  base = [alternatives[0][1] for (alternatives, _) in slots]
+  offsets = list(itertools.accumulate([len(tokens) for tokens in base],
+    initial=0))
+  swaps = [(i, word, list(itertools.chain(*(base[:i] + [alternative] \
+    + base[i + 1:])))) for i in range(len(slots)) \
+    for (word, alternative) in slots[i][0]]
+  tagged_swaps = tagger.tag_many([tokens for (_, _, tokens) in swaps])
+
+  position_words = [[] for _ in range(offsets[-1])]
+  position_tags = [[] for _ in range(offsets[-1])]
+  # Words of every slot along with their tagged tokens
+  slot_choices = [[] for _ in slots]
+  for ((i, word, _), tagged) in zip(swaps, tagged_swaps):
+    slot_choices[i] += [(word, tagged[offsets[i]:offsets[i + 1]])]
+    for j in range(offsets[i], offsets[i + 1]):
+      if tagged[j][0] not in position_words[j]:
+        position_words[j] += [tagged[j][0]]
+      if tagged[j][1] not in position_tags[j]:
+        position_tags[j] += [tagged[j][1]]
+
+  sentence = []
+  for i in range(len(slots)):
+    for j in range(offsets[i], offsets[i + 1]):
+      if slots[i][1] is not None:
+        sentence += ["{" + slots[i][1] + "}"]
+      else:
+        sentence += ["|".join(position_words[j])]
+
+  exact = []
+  sentence_count = 1
+  for choices in slot_choices:
+    sentence_count *= len(choices)
+  if sentence_count <= MAX_EXACT_SENTENCES \
+    and all([variable is None for (_, variable) in slots]):
+    for choice in itertools.product(*slot_choices):
+      words = " ".join([word for (word, _) in choice])
+      tagged = list(itertools.chain(*[tagged for (_, tagged) in choice]))
+      exact += [(" ".join(words.lower().split()), tagged)]
+
+  return " ".join(["|".join(tags) for tags in position_tags]), \
+    " ".join(sentence), exact
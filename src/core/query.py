@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the query object, which carries a user query along with
+everything derived from it (normalized text, tokens, POS tags). It is built
+once per query by the inference engine and handed to the skills, so that no
+step of answering a query has to normalize or tokenize it again.
+"""
+
+# Base imports
+from typing import List, Tuple
+
+
+def clean_text(text:str) -> str:
+  """
+  Drop all the characters of user input other than letters, digits,
+  spaces and apostrophes.
+
+  :param text: User text input
+  :type text: str
+  """
+  return "".join([c for c in text if c.isalnum() or c in " '"]).strip()
+
+
+def normalize_text(text:str) -> str:
+  """
+  Get the lowercase form of a text with whitespace collapsed to single
+  spaces.
+
+  :param text: User text input
+  :type text: str
+  """
+  return " ".join(text.lower().split())
+
+#--------------CLASS-SEPARATOR---------------#
+
+class Query(str):
+  """
+  ## Query
+  A user query, as a string of its normalized text along
+  with its tokens and POS tags.
+
+  Being a string, skills can still use it as one (with
+  `in`, `split()` and so on), but they should prefer the
+  precomputed fields:
+  - `raw`: The text as the user entered it
+  - `normalized`: Lowercase text with collapsed whitespace
+  - `tokens`: Tuple of the tokens of the normalized text
+  - `tags`: Tuple of the POS tags of the tokens
+  - `tagged`: Tuple of `(token, tag)` pairs
+  - `words`: Set of the tokens, for membership checks
+
+  Queries are immutable.
+  """
+
+  def __new__(cls, raw:str, tagged:List[Tuple[str, str]]):
+    """
+    :param raw: User text input/query
+    :type raw: str
+    :param tagged: `(token, tag)` pairs of the normalized query
+    :type tagged: List[Tuple[str, str]]
+    """
+    query = super().__new__(cls, normalize_text(raw))
+    tagged = tuple([(token, tag) for (token, tag) in tagged])
+    tokens = tuple([token for (token, _) in tagged])
+    object.__setattr__(query, "raw", raw)
+    object.__setattr__(query, "tagged", tagged)
+    object.__setattr__(query, "tokens", tokens)
+    object.__setattr__(query, "tags", tuple([tag for (_, tag) in tagged]))
+    object.__setattr__(query, "words", frozenset(tokens))
+    return query
+
+
+  def __setattr__(self, name, value):
+    raise AttributeError("Query objects are immutable")
+
+
+  def __delattr__(self, name):
+    raise AttributeError("Query objects are immutable")
+
+
+  def __reduce__(self):
+    return (Query, (self.raw, self.tagged))
+
+
+  @property
+  def normalized(self) -> str:
+    return str.__str__(self)
+
+
+  def has_word(self, word:str) -> bool:
+    """
+    Check whether a word is one of the tokens of the query.
+    """
+    return word in self.words
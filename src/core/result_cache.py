@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the result cache used by the inference engine to answer repeated
+queries without running the skills again. Skills decide whether their results
+can be cached and for how long when registering their intents.
+"""
+
+# Base imports
+import time
+from collections import OrderedDict
+from typing import List, Tuple
+
+# Gandiva imports
+from query import Query
+
+#--------------CLASS-SEPARATOR---------------#
+
+class ResultCache():
+  """
+  ## Result Cache
+  Least recently used cache of skill results, keyed on
+  the normalized query and its POS tag sequence.
+  Every entry expires after the time-to-live given by the
+  skill that produced it.
+
+  Widgets can only be shown once, so widget results are
+  only cached if they come with a `factory` function that
+  builds a fresh copy of the widget.
+  """
+
+  def __init__(self, max_size:int=64):
+    self.__max_size = max_size
+    self.__entries = OrderedDict()
+
+    self.hits = 0
+    self.misses = 0
+
+
+  @staticmethod
+  def make_key(query:Query) -> Tuple:
+    """
+    Get the cache key of a query.
+
+    :param query: User query
+    :type query: Query
+    """
+    return (query.normalized, query.tags)
+
+
+  def get(self, key:Tuple):
+    """
+    Get the cached results for a query, or `None` if there's no fresh entry.
+    """
+    if key in self.__entries:
+      expiry, results = self.__entries[key]
+      if expiry > time.monotonic():
+        self.__entries.move_to_end(key)
+        self.hits += 1
+        return [dict(result, value=result["factory"]()) if "factory" in result \
+          else result for result in results]
+
+      del self.__entries[key]
+
+    self.misses += 1
+    return None
+
+
+  def put(self, key:Tuple, results:List, ttl:float):
+    """
+    Save the results of a query for the given number of seconds.
+    """
+    if ttl <= 0:
+      return
+
+    for result in results:
+      if result["type"] == "widget" and "factory" not in result:
+        return
+
+    self.__entries[key] = (time.monotonic() + ttl, results)
+    self.__entries.move_to_end(key)
+    if len(self.__entries) > self.__max_size:
+      self.__entries.popitem(last=False)
+
+
+  def clear(self):
+    self.__entries.clear()
+
+
+  def get_stats(self):
+    """
+    Get the hit and miss counters of the cache.
+    """
+    return { "hits": self.hits, "misses": self.misses,
+      "size": len(self.__entries) }
@@ -16,7 +16,6 @@ by the user.
 
 # Base imports
 from typing import List
-import re
 import sqlite3
 import os
 from gi.repository import GLib
@@ -25,13 +24,21 @@ import sys
 import shutil
 import importlib
 import inspect
-import itertools
+import hashlib
+import json
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-from nltk.tag import pos_tag
-from nltk.tokenize import word_tokenize
+from nltk import data
 
 # Gandiva imports
 from system_portal import SystemPortal
+from context_store import skill_context
+from pattern_compiler import compile_patterns, count_alternatives, \
+  COMPILER_VERSION
 
 #--------------CLASS-SEPARATOR---------------#
 
@@ -48,6 +55,194 @@ class Intent():
 
 
 
+#--------------CLASS-SEPARATOR---------------#
+
+class LazyHandler():
+  """
+  ## Lazy Handler
+  Stands in for the intent handler of a skill which
+  hasn't been loaded yet. Skills with a manifest are only
+  imported when one of their intents is first dispatched.
+  """
+
+  def __init__(self, skill_name:str, handler_name:str):
+    self.skill_name = skill_name
+    self.__name__ = handler_name
+    self.__module__ = skill_name
+
+
+
+#--------------CLASS-SEPARATOR---------------#
+
+class RegistrationSession():
+  """
+  ## Registration Session
+  Collects the intents registered during a scan of the
+  skills and writes them all to the skills database at once.
+  Intents that are already in the database are reused, new
+  ones are compiled (in worker processes if there are a lot
+  of them), and all the rows are written in a single
+  transaction, with the syntax index rebuilt after the rows
+  are loaded.
+  """
+
+  # Starting the worker processes takes about a second, since each of them
+  # imports NLTK and loads its own tagger model, while every alternative takes
+  # about 0.2 ms to compile. Below this many alternatives in total, the intents
+  # are compiled faster in this process.
+  PARALLEL_MIN_ALTERNATIVES = 10000
+
+  def __init__(self, db_location:str):
+    self.__db_location = db_location
+    self.__known_hashes = set()
+    self.__start_time = 0
+
+    # Intents which need to be compiled and the unchanged ones, in the order
+    # they were registered in
+    self.__pending_intents = []
+    self.__reused_intents = []
+
+
+  def begin(self):
+    """
+    Prepare the skills database and start timing the registration.
+    """
+    self.__start_time = time.perf_counter()
+    self.__pending_intents = []
+    self.__reused_intents = []
+
+    skill_conn = sqlite3.connect(self.__db_location)
+
+    # Databases made by older versions are missing some of the columns
+    columns = [column[1] for column in skill_conn.execute(
+      "PRAGMA table_info(skills)")]
+    if len(columns) > 0 and ("intent_hash" not in columns \
+      or "exact_sentences" not in columns):
+      skill_conn.execute("DROP TABLE skills")
+
+    skill_conn.execute("""
+      CREATE TABLE IF NOT EXISTS skills (
+        id INTEGER NOT NULL PRIMARY KEY,
+        syntax TEXT,
+        sentence TEXT,
+        lang TEXT,
+        name TEXT,
+        classification TEXT,
+        fallback TINYINT,
+        callback_id INTEGER,
+        intent_hash TEXT,
+        exact_sentences TEXT
+      );
+    """)
+
+    skill_conn.execute("CREATE INDEX IF NOT EXISTS hash_index \
+      ON skills (intent_hash)")
+    skill_conn.commit()
+
+    self.__known_hashes = set([row[0] for row in skill_conn.execute(
+      "SELECT DISTINCT intent_hash FROM skills")])
+    skill_conn.close()
+
+
+  def add(self, callback_index:int, intent_hash:str, name:str, intent,
+    fallback:bool) -> bool:
+    """
+    Add a registered intent to the session.
+    Returns whether the intent is new and needs to be compiled.
+    """
+    if intent_hash in self.__known_hashes:
+      self.__reused_intents += [(callback_index, intent_hash)]
+      return False
+
+    self.__pending_intents += [(callback_index, intent_hash, name, intent,
+      fallback)]
+    return True
+
+
+  @staticmethod
+  def __compile_intents(pattern_groups:List[List[str]]):
+    """
+    Compile the patterns of every intent, spread across worker processes if
+    there are enough of them to make up for starting the processes.
+    """
+    workers = min(len(pattern_groups), os.cpu_count() or 1)
+    if workers <= 1 or sum([count_alternatives(patterns) for patterns \
+      in pattern_groups]) < RegistrationSession.PARALLEL_MIN_ALTERNATIVES:
+      return [compile_patterns(patterns) for patterns in pattern_groups]
+
+    try:
+      # Forking a process with running threads isn't safe, so use fresh ones
+      with ProcessPoolExecutor(max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(compile_patterns, pattern_groups,
+          [list(data.path)] * len(pattern_groups)))
+    except (OSError, BrokenProcessPool) as error:
+      print("[SkillBackend] Couldn't compile intents in parallel:", error)
+      return [compile_patterns(patterns) for patterns in pattern_groups]
+
+
+  def commit(self):
+    """
+    Compile the new intents and save all the registered intents to DB in a
+    single transaction, removing the intents of skills that were removed or
+    changed.
+    """
+    compiled_intents = iter(RegistrationSession.__compile_intents(
+      [intent.patterns for (_, _, _, intent, fallback) \
+      in self.__pending_intents if not fallback]))
+
+    rows = []
+    for (callback_index, intent_hash, name, intent, fallback) \
+      in self.__pending_intents:
+      if fallback:
+        # Fallback skills don't have intents. They just use the entire query
+        rows += [("", "", "", name, "fallback", 1, callback_index, intent_hash,
+          "[]")]
+        continue
+
+      syntax_list, sentences, exact_sentences = next(compiled_intents)
+      for i in range(len(syntax_list)):
+        rows += [(syntax_list[i], sentences[i], intent.lang, name,
+          intent.classification, 0, callback_index, intent_hash,
+          json.dumps(exact_sentences[i]))]
+
+    intent_hashes = [intent_hash for (_, intent_hash) \
+      in self.__reused_intents] + [intent[1] for intent \
+      in self.__pending_intents]
+
+    skill_conn = sqlite3.connect(self.__db_location)
+    with skill_conn:
+      # Updating the index on every insert is slower than building it once
+      skill_conn.execute("DROP INDEX IF EXISTS syntax_index")
+      skill_conn.execute("DELETE FROM skills WHERE intent_hash NOT IN (" \
+        + ",".join(["?"] * len(intent_hashes)) + ")", intent_hashes)
+      # Unchanged intents are already compiled, they just need the new callback
+      skill_conn.executemany(
+        "UPDATE skills SET callback_id = ? WHERE intent_hash = ?",
+        self.__reused_intents)
+      skill_conn.executemany("""
+        INSERT INTO skills (
+          syntax,
+          sentence,
+          lang,
+          name,
+          classification,
+          fallback,
+          callback_id,
+          intent_hash,
+          exact_sentences
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+      """, rows)
+      skill_conn.execute("CREATE INDEX syntax_index ON skills (syntax)")
+    skill_conn.close()
+
+    registration_time = (time.perf_counter() - self.__start_time) * 1000
+    print("[SkillBackend] Registered %d intents in %.0f ms" \
+      % (len(intent_hashes), registration_time), "(%d compiled, %d unchanged)" \
+      % (len(self.__pending_intents), len(self.__reused_intents)))
+
+
+
 #--------------CLASS-SEPARATOR---------------#
 
 class SkillBackend():
@@ -68,12 +263,22 @@ class SkillBackend():
   # List of intent handlers or callbacks supplied by the skills
   callback_list = []
 
-  # Dictionary of context variables which are later used to assume subjects
-  # from pronouns
-  context_dict = {}
+  # Number of seconds the results of each callback can be cached for
+  cache_ttl_list = []
+
+  # Cost class of each callback, either `COST_LOCAL` or `COST_NETWORK`
+  cost_list = []
+
+  # Context variables of every skill which are later used to assume subjects
+  # from pronouns. This is the same store however this module was imported.
+  context_store = skill_context
 
   plugin_directory = ""
 
+  # Handlers which answer from local state, and ones which need the network
+  COST_LOCAL = "local"
+  COST_NETWORK = "network"
+
   db_cursor = None
 
   VALID_INTERNAL_INTENT_HANDLERS = {
@@ -99,6 +304,16 @@ class SkillBackend():
 
     self.__portal_error_callback = None
 
+    # Hashes of the skill sources and of the intents registered by them
+    self.__skill_hashes = {}
+    self.__intent_hashes = set()
+    self.__session = RegistrationSession(self.__db_location)
+
+    # Skills which have a manifest, and the ones of them that are loaded
+    self.__manifest_skills = set()
+    self.__loaded_skills = {}
+    self.__load_lock = threading.Lock()
+
     self.portal = SystemPortal()
     self.portal.connect_error_callback(self.portal_error_handler)
 
@@ -141,29 +356,12 @@ class SkillBackend():
     The class name should be the same as the folder name with a "Skill" prefix
     So if there's a skill `FooBar`, then the folder is named `FooBar`
     the class is named `FooBarSkill`
-    """
-    if os.path.exists(self.__db_location):
-      os.remove(self.__db_location)
-
-    self.__skill_connection = sqlite3.connect(self.__db_location)
-
-    self.__skill_connection.execute("""
-      CREATE TABLE IF NOT EXISTS skills (
-        id INTEGER NOT NULL PRIMARY KEY,
-        syntax TEXT,
-        sentence TEXT,
-        lang TEXT,
-        name TEXT,
-        classification TEXT,
-        fallback TINYINT,
-        callback_id INTEGER
-      );
-    """)
-
-    self.__skill_connection.execute("CREATE INDEX IF NOT EXISTS syntax_index \
-      ON skills (syntax)")
 
-    SkillBackend.db_cursor = self.__skill_connection.cursor()
+    If the folder also has a `manifest.json` listing the intents of the skill,
+    the intents are registered from it and the skill is only imported when
+    one of its intents is first dispatched (see `get_callback()`).
+    """
+    self.__session.begin()
 
     sys.path.append(SkillBackend.plugin_directory)
 
@@ -172,159 +370,152 @@ class SkillBackend():
       if dir_entry.is_dir():
         classes += [dir_entry.name]
 
-    if self.__skill_connection:
-      self.__skill_connection.close()
-
+    self.__skill_hashes = {}
+    self.__intent_hashes = set()
+    self.__manifest_skills = set()
+    self.__loaded_skills = {}
     for class_name in classes:
-      module = importlib.import_module(class_name)
-      skill_class = getattr(module, class_name + "Skill")
-      if inspect.getmro(skill_class)[1].__module__ + "." \
-        + inspect.getmro(skill_class)[1].__name__ \
-        == "gandiva.core.skill_backend.Skill":
-        SkillBackend.skills_list += [skill_class(self)]
+      skill_directory = os.path.join(SkillBackend.plugin_directory, class_name)
+      self.__skill_hashes[class_name + "Skill"] = self.__hash_skill_source(
+        skill_directory)
+      manifest_path = os.path.join(skill_directory, "manifest.json")
+      if os.path.exists(manifest_path):
+        self.__register_manifest(class_name, manifest_path)
+      else:
+        self.__load_skill(class_name)
+
+    self.__session.commit()
 
 
-  def __permute_pattern(self, patterns:List[str]):
+  def __load_skill(self, class_name:str):
     """
-    Find all possible combinations from the given sentence in intent.
+    Import a skill and create an instance of it.
     """
-    sentence_groups = []
-    variable_groups = []
-    for pattern in patterns:
-      tokens = pattern.split(" ")
-      pattern_list = []
-      token_index = 0
-      variable_indices = []
-      for token in tokens:
-        # If the token is an array of possible words
-        if re.search(r"^\[.*\]$", token) is not None:
-          sub_tokens = token.replace("[", "").replace("]", "").split(",")
-          pattern_list += [sub_tokens]
-        # If the token is a variable
-        elif re.search(r"^{.*}$", token) is not None:
-          sub_tokens = token.replace("{", "").replace("}", "").split(",")
-          # First item is always the token name
-          variable = sub_tokens[0]
-          # the other ones represent the possible tags
-          variable_indices += [(variable, token_index)]
-          tags = sub_tokens[1:]
-          if len(tags) == 0:
-            print("[SkillBackend] Intent Error: Speech tags not associated \
-              with variable <" + variable + ">")
-            break
-          possible_words = []
-          # Temporarily substitute the variables to facilitate pos tagging
-          for tag in tags:
-            if tag == "JJ": # Adjective
-              possible_words += ["nice"]
-            elif tag == "RB": # Adverb
-              possible_words += ["nicely"]
-            elif tag == "VB": # Adverb
-              possible_words += ["do"]
-            else: # Probably noun
-              possible_words += ["Amanda"]
-          pattern_list += [possible_words]
-        else:
-          pattern_list += [[token]]
-        token_index += 1
-
-      # Reference: https://www.quora.com/How-do-I-generate-all-the-unique-combinations-of-a-2D-array-in-Python
-      sentence_groups += [
-        [" ".join(token) for token in itertools.product(*pattern_list)]
-      ]
-      variable_groups += [variable_indices]
-
-    syntax_list = []
-    converted_sentences = []
-    for i in range(len(sentence_groups)):
-      for j in range(len(sentence_groups[i])):
-        tokenized = word_tokenize(sentence_groups[i][j])
-        intent_tags = pos_tag(tokenized)
-        tag_list = []
-        for tag in intent_tags:
-          tag_list += [tag[1]]
-        syntax_list += [" ".join(tag_list)]
-        for variable_tuple in variable_groups[i]:
-          tokenized[variable_tuple[1]] = "{" + variable_tuple[0] + "}"
-        converted_sentences += [" ".join(tokenized)]
-
-    return syntax_list, converted_sentences
+    module = importlib.import_module(class_name)
+    skill_class = getattr(module, class_name + "Skill")
+    if inspect.getmro(skill_class)[1].__module__ + "." \
+      + inspect.getmro(skill_class)[1].__name__ \
+      == "gandiva.core.skill_backend.Skill":
+      skill = skill_class(self)
+      SkillBackend.skills_list += [skill]
+      self.__loaded_skills[class_name] = skill
+      return skill
+
+    return None
+
+
+  def __register_manifest(self, class_name:str, manifest_path:str):
+    """
+    Register the intents listed in the manifest of a skill, without importing
+    the skill.
+    """
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+      manifest = json.load(manifest_file)
+
+    self.__manifest_skills.add(class_name + "Skill")
+    for entry in manifest["intents"]:
+      fallback = entry.get("fallback", False)
+      intent = None
+      if not fallback:
+        intent = Intent(entry["classification"], entry["patterns"],
+          entry["lang"])
+      self.register_intent(LazyHandler(class_name, entry["handler"]), intent,
+        class_name + "Skill", entry.get("example", ""), fallback,
+        entry.get("cache_ttl", 0), entry.get("cost", SkillBackend.COST_LOCAL))
+
+
+  def get_callback(self, callback_id:int):
+    """
+    Get the intent handler with the given callback ID, loading its skill if
+    it hasn't been loaded yet. Returns `None` if the skill can't be loaded.
+    """
+    callback = SkillBackend.callback_list[callback_id]
+    if not isinstance(callback, LazyHandler):
+      return callback
+
+    with self.__load_lock:
+      try:
+        skill = self.__loaded_skills.get(callback.skill_name)
+        if skill is None:
+          print("[SkillBackend] Loading", callback.skill_name, "skill…")
+          skill = self.__load_skill(callback.skill_name)
+        handler = getattr(skill, callback.__name__)
+      except (ImportError, AttributeError) as error:
+        print("[SkillBackend] Couldn't load", callback.skill_name, "skill:",
+          error)
+        return None
+
+    SkillBackend.callback_list[callback_id] = handler
+    return handler
+
+
+  def __hash_skill_source(self, skill_directory:str) -> str:
+    """
+    Get a hash of the code and the manifest of a skill. Other files, like
+    images, can't change the intents of the skill, so they aren't read.
+    """
+    source_hash = hashlib.sha256()
+    for (root, dirs, files) in os.walk(skill_directory):
+      dirs[:] = sorted([directory for directory in dirs \
+        if directory != "__pycache__"])
+      for file_name in sorted(files):
+        if not file_name.endswith(".py") and file_name != "manifest.json":
+          continue
+        path = os.path.join(root, file_name)
+        source_hash.update(os.path.relpath(path, skill_directory).encode())
+        with open(path, "rb") as source_file:
+          source_hash.update(source_file.read())
+
+    return source_hash.hexdigest()
+
+
+  def __hash_intent(self, intent_handler_callback, intent:Intent, name:str,
+    fallback:bool) -> str:
+    """
+    Get a hash which changes whenever the skill's source or the intent changes,
+    so the compiled intent sentences can be reused across launches.
+    """
+    intent_hash = hashlib.sha256("\n".join([
+      str(COMPILER_VERSION),
+      self.__skill_hashes.get(name, ""),
+      name,
+      intent_handler_callback.__name__,
+      str(fallback)
+    ] + ([] if intent is None else [intent.classification, intent.lang] \
+      + intent.patterns)).encode()).hexdigest()
+
+    # The same handler may be registered more than once with the same intent
+    while intent_hash in self.__intent_hashes:
+      intent_hash = hashlib.sha256(intent_hash.encode()).hexdigest()
+
+    self.__intent_hashes.add(intent_hash)
+    return intent_hash
 
 
   def register_intent(self, intent_handler_callback, intent:Intent, name:str,
-    example:str, fallback:bool):
+    example:str, fallback:bool, cache_ttl:float=0,
+    cost:str=COST_LOCAL):
     """
     Save the intent details and saved callback index to DB.
     """
-
-    if not fallback:
-      print("[SkillBackend] Registering intent for", name, "skill…")
-      SkillBackend.callback_list += [intent_handler_callback]
-      callback_index = len(SkillBackend.callback_list) - 1
-
-      syntax_list, sentences = self.__permute_pattern(intent.patterns)
-
-      db_location = GLib.get_user_cache_dir() + "/" + constants.APPLICATION_ID \
-        + "/databases/skills.db"
-      skill_conn = sqlite3.connect(db_location)
-      db_cursor = skill_conn.cursor()
-
-      i = 0
-      for syntax in syntax_list:
-        db_cursor.execute("""
-          INSERT INTO skills (
-            syntax,
-            sentence,
-            lang,
-            name,
-            classification,
-            fallback,
-            callback_id
-          ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-          syntax,
-          sentences[i],
-          intent.lang,
-          name,
-          intent.classification,
-          0,
-          callback_index
-        ))
-        i += 1
-
-      skill_conn.commit()
-      skill_conn.close()
-    else:
-      # Fallback skills don't have intents. They just use the entire query
-      print("[SkillBackend] Registering fallback intent for", name, "skill…")
-      SkillBackend.callback_list += [intent_handler_callback]
-      callback_index = len(SkillBackend.callback_list) - 1
-      db_location = GLib.get_user_cache_dir() + "/" + constants.APPLICATION_ID \
-        + "/databases/skills.db"
-      skill_conn = sqlite3.connect(db_location)
-      db_cursor = skill_conn.cursor()
-      db_cursor.execute("""
-        INSERT INTO skills (
-          syntax,
-          sentence,
-          lang,
-          name,
-          classification,
-          fallback,
-          callback_id
-        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-      """, (
-        "",
-        "",
-        "",
-        name,
-        "fallback",
-        1,
-        callback_index
-      ))
-
-      skill_conn.commit()
-      skill_conn.close()
+    # Skills with a manifest have their intents registered from it already
+    if name in self.__manifest_skills \
+      and not isinstance(intent_handler_callback, LazyHandler):
+      return
+
+    SkillBackend.callback_list += [intent_handler_callback]
+    SkillBackend.cache_ttl_list += [cache_ttl]
+    SkillBackend.cost_list += [cost]
+    callback_index = len(SkillBackend.callback_list) - 1
+    intent_hash = self.__hash_intent(intent_handler_callback, intent, name,
+      fallback)
+
+    if self.__session.add(callback_index, intent_hash, name, intent,
+      fallback):
+      if fallback:
+        print("[SkillBackend] Registering fallback intent for", name, "skill…")
+      else:
+        print("[SkillBackend] Registering intent for", name, "skill…")
 
     # Store the example queries supplied by the skill
     if example != "":
@@ -358,19 +549,65 @@ class Skill():
 
 
   def register_intent(self, handler_callback, intent:Intent,
-    example_query:str="", fallback:bool=False):
+    example_query:str="", fallback:bool=False, cache_ttl:float=0,
+    cost:str=SkillBackend.COST_LOCAL):
     """
     Add this skill to the AI skillset.
-
-    :param handler_callback: Callback function used to handle intent
+    Skills with a `manifest.json` don't need to call this, since their intents
+    are registered from the manifest, which has an entry like the following
+    for every intent (`example`, `fallback`, `cache_ttl` and `cost` are
+    optional):
+    `{ "handler": "time_intent_handler", "classification": "time",
+    "patterns": ["what time is it"], "lang": "en-us", "example": "What time
+    is it?", "fallback": false, "cache_ttl": 0, "cost": "local" }`
+
+    :param handler_callback: Callback function used to handle intent. This can
+    also be an `async def` function, which is run on the event loop of the
+    core loop. Such handlers should use the `_async` methods of the portal
+    for I/O. Handlers get the query as a `Query` (see `query.py`), so they
+    should use its `tokens`, `tags` and `words` instead of splitting it again.
     :param intent: An intent (see Intent) that the skill can handle
     :param example_query: An example query that the user can send to trigger
     this skill
     :param fallback: Whether or not to register as a fallback which runs only
     when all other skills have failed.
     If `True`, pass `None` for intent paramter.
+    :param cache_ttl: Number of seconds for which the answer to a query can be
+    reused when the same query is asked again. `0` disables caching.
+    Widget results are only cached if they also have a `factory` function
+    which builds a new copy of the widget.
+    :param cost: `"local"` if the handler answers from the computer itself, or
+    `"network"` if it needs to go online. Among skills that match a query
+    about as well, local ones are tried first. The measured time of the
+    handlers takes over from this once there are enough samples.
     """
     self.__skill_backend.register_intent(handler_callback, intent,
-      self.__class__.__name__, example_query, fallback)
+      self.__class__.__name__, example_query, fallback, cache_ttl, cost)
 
     # self.__skill_backend.register_settings()
+
+
+  def set_context(self, key:str, value, ttl:float=None):
+    """
+    Remember something about the conversation, like the subject of the last
+    query, so that follow-up queries with pronouns can be answered. The
+    intent handlers of this skill get it in their `context` argument.
+
+    :param key: Name of the context variable
+    :type key: str
+    :param value: Value of the context variable
+    :param ttl: Number of seconds after which the variable is forgotten, or
+    `None` to keep it until newer variables push it out
+    :type ttl: float
+    """
+    SkillBackend.context_store.get_namespace(self.__class__.__name__).set(key,
+      value, ttl)
+
+
+  def get_context(self, key:str, default=None):
+    """
+    Get a context variable set with `set_context()`, or `default` if it
+    isn't set or has expired.
+    """
+    return SkillBackend.context_store.get_namespace(
+      self.__class__.__name__).get(key, default)
@@ -7,18 +7,14 @@ This file implements the speech-to-text system using _vosk_.
 """
 
 # Base imports
-import alsaaudio
 import numpy
 import _thread
 import json
-from vosk import Model, KaldiRecognizer
+from vosk import KaldiRecognizer
 
 # Gandiva imports
-from config import constants
-
-
-# Based on solution from
-# https://stackoverflow.com/questions/6867675/audio-recording-in-python
+from model_registry import ModelRegistry
+from audio_capture import AudioCapture, AudioReader
 
 #--------------CLASS-SEPARATOR---------------#
 
@@ -27,12 +23,29 @@ class SpeechTotext():
   ## Speech-to-Text
   Interprets speech to text using VOSK
   with a given speech model.
+
+  While the user is speaking, the partial transcript is
+  sent out whenever it changes, and once more when it
+  has stopped changing for a while (it's stable).
   """
 
-  def __init__(self):
+  # Number of periods of audio that the partial transcript has to stay the
+  # same for to be stable
+  STABLE_PERIODS = 5
+
+  def __init__(self, audio_capture:AudioCapture, pre_roll:float=0.3):
+    """
+    :param audio_capture: Audio capture shared with the wakeword engine
+    :type audio_capture: AudioCapture
+    :param pre_roll: Number of seconds of audio from before listening starts
+    that is recognized too, so that the first syllables after the wakeword
+    aren't lost
+    :type pre_roll: float
+    """
     # Init callbacks
     self.__audio_input_callback = None
     self.__recognition_complete_callback = None
+    self.__partial_recognition_callback = None
 
     # recording thread inputs
     self.__recording = False
@@ -40,34 +53,38 @@ class SpeechTotext():
     # if not os.path.exists(self.recoding_path):
     #   os.mkdir(self.recoding_path)
 
-    self.__model_location = constants.DATA_PATH + "/SpeechRecognitionModels/" \
-        + "vosk-model-small-en-us-0.15"
-
     self.__model = None
     self.__recognizer = None
 
+    self.__audio_capture = audio_capture
+    self.__pre_roll = pre_roll
+    self.__reader = None
+
+    # Latest partial transcript and the number of periods it's been the same
+    self.__partial_text = ""
+    self.__partial_periods = 0
+
+    # Audio is captured at the rate of the model, so it's never resampled
+    self.__sample_rate = audio_capture.sample_rate
+
 
   def initialize(self):
     """
-    Initialize Recognizer
+    Initialize Recognizer.
+    The speech model is shared with the wakeword engine.
     """
-    self.__model = Model(self.__model_location)
-    self.__recognizer = KaldiRecognizer(self.__model, 44100)
+    self.__model = ModelRegistry.get_model()
+    self.__recognizer = KaldiRecognizer(self.__model, self.__sample_rate)
 
 
-  def __record(self):
+  def __record(self, reader:AudioReader):
     """
     Recording thread function
     """
-    self.__recording = True
-    # Initialize alsa instance
-    sound_input = alsaaudio.PCM(alsaaudio.PCM_CAPTURE)
-    sound_input.setchannels(1)
-    sound_input.setrate(44100)
-    sound_input.setformat(alsaaudio.PCM_FORMAT_S16_LE)
-    sound_input.setperiodsize(1024)
-    while self.__recording:
-      _, data = sound_input.read()
+    while self.__recording and self.__reader is reader:
+      data = reader.read(timeout=0.5)
+      if data is None:
+        continue
       a = numpy.fromstring(data, dtype="int16")
       if self.__audio_input_callback is not None:
         self.__audio_input_callback(numpy.abs(a).mean())
@@ -77,15 +94,39 @@ class SpeechTotext():
         self.__recognition_complete(result["text"])
         self.__recording = False
         break
-    sound_input.close()
+      self.__update_partial(
+        json.loads(self.__recognizer.PartialResult())["partial"])
+    reader.close()
+
+
+  def __update_partial(self, text:str):
+    """
+    Send out the partial transcript if it changed, or if it just became
+    stable.
+    """
+    if text != self.__partial_text:
+      self.__partial_text = text
+      self.__partial_periods = 0
+      if text != "":
+        self.__partial_recognition(text, False)
+    else:
+      self.__partial_periods += 1
+      if text != "" \
+        and self.__partial_periods == SpeechTotext.STABLE_PERIODS:
+        self.__partial_recognition(text, True)
 
 
   def start_listening(self):
     """
-    Start listening thread
+    Start listening thread.
+    The audio is read from the shared capture, starting from the pre-roll.
     """
     if not self.__recording and self.__recognizer is not None:
-      _thread.start_new_thread(self.__record, ())
+      self.__recording = True
+      self.__partial_text = ""
+      self.__partial_periods = 0
+      self.__reader = self.__audio_capture.open_reader(self.__pre_roll)
+      _thread.start_new_thread(self.__record, (self.__reader,))
 
 
   def stop_listening(self):
@@ -102,6 +143,8 @@ class SpeechTotext():
     Supported Event Type Options:
     - `audio`
     - `recognition-complete`
+    - `partial-recognition`: Called with the partial transcript and whether
+      it's stable
 
     :param event_type: Type of event. Can be one of supported event type options
     :type event_type: str
@@ -111,9 +154,15 @@ class SpeechTotext():
       self.__audio_input_callback = callback
     elif event_type == "recognition-complete":
       self.__recognition_complete_callback = callback
+    elif event_type == "partial-recognition":
+      self.__partial_recognition_callback = callback
 
 
   # Event handlers
   # ----------------------------------------------------------------------------
   def __recognition_complete(self, text: str):
     self.__recognition_complete_callback(text)
+
+  def __partial_recognition(self, text: str, stable: bool):
+    if self.__partial_recognition_callback is not None:
+      self.__partial_recognition_callback(text, stable)
@@ -9,6 +9,7 @@ finding location, etc. It all goes through one central place.
 """
 
 # Base imports
+import asyncio
 import requests
 import subprocess
 import geocoder
@@ -58,6 +59,20 @@ class SystemPortal():
     return response
 
 
+  async def http_get_async(self, url:str, params, auth=None):
+    """
+    Awaitable version of `http_get()`, for use in `async def` intent
+    handlers. The request runs in the event loop's thread pool, so other
+    handlers can carry on with their own requests in the meantime.
+
+    :param url: Uniform Resource Locator string or address of the API
+    :type url: str
+    :param params: Paramters supported by the API for HTTPGET request
+    """
+    return await asyncio.get_running_loop().run_in_executor(None,
+      self.http_get, url, params, auth)
+
+
   def open_uri(self, URI:str):
     """
     Opan a file or web resource based on the URI in the
@@ -86,3 +101,12 @@ class SystemPortal():
       self.handle_error(SystemPortal.ERROR_NO_GEO_LOCATION)
 
     return latlng
+
+
+  async def get_location_async(self):
+    """
+    Awaitable version of `get_location()`, for use in `async def` intent
+    handlers.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None,
+      self.get_location)
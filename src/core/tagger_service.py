@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the tagger service, which gives the POS tags of token sequences.
+The tagger model is loaded once per process, instead of being looked up by
+`nltk.pos_tag` on every call, and the tags of recently seen sequences are
+remembered, since the same queries and pattern sentences come up again and
+again. Like the pattern compiler, it only depends on NLTK.
+"""
+
+# Base imports
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from nltk.tag.perceptron import PerceptronTagger
+
+#--------------CLASS-SEPARATOR---------------#
+
+class TaggerService():
+  """
+  ## Tagger Service
+  Memoized POS tagger. The perceptron tagger model is
+  shared by every instance in the process and loaded on
+  first use (or `warm_up()`), while every instance keeps
+  its own least recently used memo of tagged sequences.
+  """
+
+  # Loaded tagger models, by language
+  __models = {}
+  __models_lock = threading.Lock()
+
+  def __init__(self, max_size:int=4096, lang:str="eng"):
+    """
+    :param max_size: Max number of token sequences whose tags are remembered
+    :type max_size: int
+    :param lang: Language of the tagger model
+    :type lang: str
+    """
+    self.__max_size = max_size
+    self.__lang = lang
+    self.__memo = OrderedDict()
+    self.__memo_lock = threading.Lock()
+
+    self.hits = 0
+    self.misses = 0
+
+
+  def warm_up(self):
+    """
+    Load the tagger model now, so that the first query doesn't wait for it.
+    """
+    self.__get_model()
+
+
+  def __get_model(self) -> PerceptronTagger:
+    model = TaggerService.__models.get(self.__lang)
+    if model is None:
+      with TaggerService.__models_lock:
+        model = TaggerService.__models.get(self.__lang)
+        if model is None:
+          model = PerceptronTagger(lang=self.__lang)
+          TaggerService.__models[self.__lang] = model
+
+    return model
+
+
+  def tag(self, tokens:List[str]) -> List[Tuple[str, str]]:
+    """
+    Get the `(token, tag)` pairs of a token sequence.
+
+    :param tokens: Tokens of a sentence
+    :type tokens: List[str]
+    """
+    return self.tag_many([tokens])[0]
+
+
+  def tag_many(self, sentences:List[List[str]]) -> List[List[Tuple[str, str]]]:
+    """
+    Get the `(token, tag)` pairs of many token sequences in one call.
+    Sequences that were seen before aren't tagged again.
+
+    :param sentences: Tokens of every sentence
+    :type sentences: List[List[str]]
+    """
+    keys = [tuple(tokens) for tokens in sentences]
+    results = {}
+    with self.__memo_lock:
+      for key in keys:
+        if key in self.__memo:
+          self.__memo.move_to_end(key)
+          results[key] = self.__memo[key]
+          self.hits += 1
+
+    missing = [key for key in dict.fromkeys(keys) if key not in results]
+    if len(missing) > 0:
+      model = self.__get_model()
+      tagged_sentences = [model.tag(list(key)) for key in missing]
+      with self.__memo_lock:
+        for (key, tagged) in zip(missing, tagged_sentences):
+          results[key] = tagged
+          self.__memo[key] = tagged
+          self.__memo.move_to_end(key)
+          self.misses += 1
+        while len(self.__memo) > self.__max_size:
+          self.__memo.popitem(last=False)
+
+    return [list(results[key]) for key in keys]
+
+
+  def clear(self):
+    """
+    Forget all the remembered tags.
+    """
+    with self.__memo_lock:
+      self.__memo.clear()
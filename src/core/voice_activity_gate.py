@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+This file has the voice activity gate, which sits in front of the wakeword
+recognizer so that only audio which probably has someone speaking in it is
+recognized. Recognizing audio is far more expensive than measuring how loud it
+is, so the gate keeps the always-on wakeword engine mostly idle in a quiet
+room.
+"""
+
+# Base imports
+import numpy
+import threading
+from collections import deque
+from typing import Dict, List, Tuple
+
+#--------------CLASS-SEPARATOR---------------#
+
+class VoiceActivityGate():
+  """
+  ## Voice Activity Gate
+  Energy based voice activity detector. A period of audio
+  is speech if its RMS level is a number of times louder
+  than the background noise level, which is tracked as a
+  moving average of the periods that aren't speech.
+
+  Background noise that gets louder would look like speech
+  forever, so the noise level is also raised to the
+  quietest period of a window of recent periods. Speech
+  has pauses in it, so it doesn't raise the noise level
+  this way, but steady noise does once it fills the window.
+
+  Once speech starts, the gate lets through a few periods
+  from before it (pre-roll), so the start of the first word
+  isn't cut off, and stays open for a few periods after it
+  (hangover), so pauses between words don't close it.
+  """
+
+  def __init__(self, pre_roll_periods:int=4, hangover_periods:int=8,
+    threshold_ratio:float=3, min_rms:float=100,
+    noise_smoothing:float=0.05, noise_window_periods:int=150):
+    """
+    :param pre_roll_periods: Number of periods before speech to let through
+    :type pre_roll_periods: int
+    :param hangover_periods: Number of quiet periods after speech before the
+    gate closes
+    :type hangover_periods: int
+    :param threshold_ratio: How many times louder than the noise level a
+    period has to be to count as speech
+    :type threshold_ratio: float
+    :param min_rms: Lowest RMS level (of 16 bit samples) that counts as speech
+    :type min_rms: float
+    :param noise_smoothing: Weight of every quiet period in the noise level
+    :type noise_smoothing: float
+    :param noise_window_periods: Number of recent periods whose quietest one
+    the noise level is raised to, which is about 10 seconds by default
+    :type noise_window_periods: int
+    """
+    self.__hangover_periods = hangover_periods
+    self.__threshold_ratio = threshold_ratio
+    self.__min_rms = min_rms
+    self.__noise_smoothing = noise_smoothing
+
+    self.__pre_roll = deque(maxlen=pre_roll_periods)
+    self.__hangover = 0
+    self.__noise_rms = None
+    self.__recent_rms = deque(maxlen=noise_window_periods)
+
+    self.__lock = threading.Lock()
+    self.__periods = 0
+    self.__passed_periods = 0
+    self.__segments = 0
+
+
+  @staticmethod
+  def get_rms(data:bytes) -> float:
+    """
+    Get the RMS level of a period of 16 bit audio.
+    """
+    samples = numpy.frombuffer(data, dtype=numpy.int16).astype(numpy.float32)
+    if len(samples) == 0:
+      return 0.0
+
+    return float(numpy.sqrt(numpy.mean(samples * samples)))
+
+
+  def is_open(self) -> bool:
+    return self.__hangover > 0
+
+
+  def process(self, data:bytes) -> Tuple[List[bytes], bool]:
+    """
+    Pass a period of audio through the gate.
+    Returns the periods that should be recognized (the pre-roll and this
+    period when speech starts, this period while it lasts, or none), and
+    whether the speech has just ended, in which case the recognizer should
+    be asked for its final result.
+
+    :param data: Period of 16 bit mono audio
+    :type data: bytes
+    """
+    rms = VoiceActivityGate.get_rms(data)
+    if self.__noise_rms is None:
+      self.__noise_rms = rms
+    is_speech = rms >= max(self.__min_rms,
+      self.__noise_rms * self.__threshold_ratio)
+
+    periods = []
+    ended = False
+    if is_speech:
+      if self.__hangover == 0:
+        # Speech started
+        periods = list(self.__pre_roll)
+        self.__pre_roll.clear()
+        with self.__lock:
+          self.__segments += 1
+      periods += [data]
+      self.__hangover = self.__hangover_periods
+    elif self.__hangover > 0:
+      periods = [data]
+      self.__hangover -= 1
+      ended = self.__hangover == 0
+    else:
+      self.__pre_roll.append(data)
+
+    self.__recent_rms.append(rms)
+    if not is_speech:
+      self.__noise_rms += self.__noise_smoothing * (rms - self.__noise_rms)
+    elif len(self.__recent_rms) == self.__recent_rms.maxlen:
+      self.__noise_rms = max(self.__noise_rms, min(self.__recent_rms))
+
+    with self.__lock:
+      self.__periods += 1
+      self.__passed_periods += len(periods)
+
+    return periods, ended
+
+
+  def reset(self):
+    """
+    Close the gate and forget the audio kept for the pre-roll, keeping the
+    noise level.
+    """
+    self.__pre_roll.clear()
+    self.__hangover = 0
+
+
+  def get_stats(self) -> Dict:
+    """
+    Get the number of periods seen by the gate, the number of them that were
+    let through (including pre-roll), the number of speech segments and the
+    current noise level.
+    """
+    with self.__lock:
+      return {
+        "periods": self.__periods,
+        "passed_periods": self.__passed_periods,
+        "pass_rate": self.__passed_periods / self.__periods \
+          if self.__periods > 0 else 0.0,
+        "speech_segments": self.__segments,
+        "noise_rms": self.__noise_rms
+      }
@@ -5,16 +5,20 @@
 """
 This code implements the wakeword engine which continuosly listens for a
 wakeword or hot word.Wake word currently set is _"Hey Gandiva"_.
+Only audio that passes the voice activity gate is recognized, so the engine
+stays mostly idle while nobody is speaking.
 """
 
 # Base imports
-import alsaaudio
 import _thread
 import json
-from vosk import Model, KaldiRecognizer
+from typing import Dict
+from vosk import KaldiRecognizer
 
 # Gandiva imports
-from config import constants
+from model_registry import ModelRegistry
+from audio_capture import AudioCapture, AudioReader
+from voice_activity_gate import VoiceActivityGate
 
 #--------------CLASS-SEPARATOR---------------#
 
@@ -24,21 +28,25 @@ class WakeWordEngine():
   Listens for a wakeword or hot word.
   Wake word is "Hey Gandiva".
   """
-  def __init__(self):
+  def __init__(self, audio_capture:AudioCapture):
+    """
+    :param audio_capture: Audio capture shared with the speech-to-text system
+    :type audio_capture: AudioCapture
+    """
     # Callbacks
     self.__callback = None
 
-    # Setup alsa audio input
-    self.inp = alsaaudio.PCM(alsaaudio.PCM_CAPTURE)
-    self.inp.setchannels(1)
-    self.inp.setrate(44100)
-    self.inp.setformat(alsaaudio.PCM_FORMAT_S16_LE)
-    self.inp.setperiodsize(1024)
+    # Audio input, at the rate of the speech model so that the recognizer
+    # doesn't have to resample it
+    self.__audio_capture = audio_capture
+    self.__sample_rate = audio_capture.sample_rate
     self.__recording = False
+    self.__reader = None
 
-    # Load speech model
-    self.__model_location = constants.DATA_PATH + '/SpeechRecognitionModels/' \
-      + 'vosk-model-small-en-us-0.15'
+    # Skips recognizing audio without speech in it
+    self.__gate = VoiceActivityGate()
+
+    # Speech model, shared with the speech-to-text system
     self.__model = None
     # These words roughly form our app's name
     self.__recognizer = None
@@ -48,9 +56,9 @@ class WakeWordEngine():
     """
     Initialize recognizer
     """
-    self.__model = Model(self.__model_location)
+    self.__model = ModelRegistry.get_model()
 
-    self.__recognizer = KaldiRecognizer(self.__model, 44100,
+    self.__recognizer = KaldiRecognizer(self.__model, self.__sample_rate,
       '["hey gun diva", "[unk]"]')
 
 
@@ -59,23 +67,49 @@ class WakeWordEngine():
     Start listening thread.
     """
     if not self.__recording:
-      _thread.start_new_thread(self.__continuous_listening_thread, ())
+      self.__recording = True
+      self.__reader = self.__audio_capture.open_reader()
+      _thread.start_new_thread(self.__continuous_listening_thread,
+        (self.__reader,))
 
 
-  def __continuous_listening_thread(self):
+  def __continuous_listening_thread(self, reader:AudioReader):
     """
     Wakeword listening thread.
     Exits when wakeword detected.
     """
-    self.__recording = True
-    while self.__recording:
-      _, data = self.inp.read()
-      if self.__recognizer is not None and self.__recognizer.AcceptWaveform(data):
-        result = json.loads(self.__recognizer.Result())
-        if result['text'] == 'hey gun diva':
-          self.__recording = False
-          self.__callback()
-          break
+    self.__gate.reset()
+    # A thread that was stopped and is replaced by a newer one before it
+    # notices exits too
+    while self.__recording and self.__reader is reader:
+      data = reader.read(timeout=0.5)
+      if data is None or self.__recognizer is None:
+        continue
+
+      detected = False
+      periods, ended = self.__gate.process(data)
+      for period in periods:
+        if self.__recognizer.AcceptWaveform(period):
+          detected = detected or WakeWordEngine.__is_wake_word(
+            self.__recognizer.Result())
+      # The silence after the speech isn't recognized, so the recognizer
+      # needs to be told that the speech is over
+      if ended and not detected:
+        detected = WakeWordEngine.__is_wake_word(
+          self.__recognizer.FinalResult())
+
+      if detected:
+        self.__recording = False
+        # The reader is still open, so the capture keeps running while the
+        # speech-to-text system takes over
+        self.__callback()
+        break
+    reader.close()
+
+
+  @staticmethod
+  def __is_wake_word(result:str) -> bool:
+    return json.loads(result)['text'] == 'hey gun diva'
 
 
   def stop(self) -> None:
@@ -85,6 +119,14 @@ class WakeWordEngine():
     self.__recording = False
 
 
+  def get_gate_stats(self) -> Dict:
+    """
+    Get how much of the audio was let through to the recognizer by the voice
+    activity gate (see `VoiceActivityGate.get_stats()`).
+    """
+    return self.__gate.get_stats()
+
+
   def connect(self, callback = None):
     """
     Add callback reference to handle wakeword activation event.
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+Makes the modules of this source tree importable the same way as in the
+installed app (see `src/gandiva.in`), both by their bare names and from the
+`gandiva` package.
+"""
+
+# Base imports
+import os
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_package_dir = tempfile.mkdtemp(prefix="gandiva-tests-")
+os.symlink(os.path.join(REPO_DIR, "src"), os.path.join(_package_dir,
+  "gandiva"))
+sys.path.insert(0, _package_dir)
+for path in ["utils", "", "shell", "core"]:
+  sys.path.insert(1, os.path.join(REPO_DIR, "src", path))
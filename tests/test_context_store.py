@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+Tests of the context store shared by the skills and the inference engine.
+"""
+
+# Base imports
+import pytest
+
+
+def test_skill_context_reaches_engine():
+  # Skills import the skill backend from the `gandiva` package, while the
+  # inference engine imports it as a top-level module
+  skill_side = pytest.importorskip("gandiva.core.skill_backend")
+  engine_side = pytest.importorskip("skill_backend")
+  assert skill_side is not engine_side
+
+  class ContextProbeSkill(skill_side.Skill):
+    pass
+
+  probe = ContextProbeSkill(None)
+  probe.set_context("subject", "saturn")
+  namespace = engine_side.SkillBackend.context_store.get_namespace(
+    "ContextProbeSkill")
+  try:
+    assert namespace.get("subject") == "saturn"
+    namespace.delete("subject")
+    assert probe.get_context("subject") is None
+  finally:
+    namespace.clear()
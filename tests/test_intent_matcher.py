@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: 2022 Subhadeep Jasu <subhajasu@gmail.com>
+
+"""
+Tests of the intent matcher, with a skills database of hand written rows.
+"""
+
+# Base imports
+import sqlite3
+
+# Gandiva imports
+from intent_matcher import IntentMatcher
+
+
+def make_matcher(tmp_path, rows):
+  """
+  Compile an intent matcher from `(syntax, sentence)` rows.
+  """
+  db_location = str(tmp_path / "skills.db")
+  skill_conn = sqlite3.connect(db_location)
+  with skill_conn:
+    skill_conn.execute("""
+      CREATE TABLE skills (
+        id INTEGER NOT NULL PRIMARY KEY,
+        syntax TEXT,
+        sentence TEXT,
+        lang TEXT,
+        name TEXT,
+        classification TEXT,
+        fallback TINYINT,
+        callback_id INTEGER,
+        intent_hash TEXT,
+        exact_sentences TEXT
+      );
+    """)
+    skill_conn.executemany("""
+      INSERT INTO skills (syntax, sentence, lang, name, classification,
+        fallback, callback_id, intent_hash, exact_sentences)
+      VALUES (?, ?, 'en-us', ?, 'test', 0, ?, '', '[]')
+    """, [(syntax, sentence, "Skill%d" % i, i) for (i, (syntax, sentence)) \
+      in enumerate(rows)])
+  skill_conn.close()
+
+  matcher = IntentMatcher()
+  matcher.compile(db_location)
+  return matcher
+
+
+def test_shortlist_is_ranked_by_confidence(tmp_path):
+  # The longer pattern scores higher, but matches the query less closely
+  matcher = make_matcher(tmp_path, [
+    ("VB NN NN", "open firefox browser"),
+    ("VB NN", "open|launch {name}")
+  ])
+  tokens, tags = ["open", "firefox"], ["VB", "NN"]
+
+  indices = matcher.match(tags)
+  scores = matcher.score(indices, tokens, tags)
+  assert scores[0] > scores[1]
+
+  short_listed, confidence = matcher.shortlist(tokens, tags)
+  assert short_listed == [1, 0]
+  assert confidence == sorted(confidence, reverse=True)
+  assert confidence[0] == max(matcher.get_confidence(indices, scores, tokens))
+
+
+def test_shortlist_needs_a_valid_score(tmp_path):
+  matcher = make_matcher(tmp_path, [("VB NN", "open|launch {name}")])
+
+  assert matcher.shortlist(["close", "firefox"], ["VB", "NN"]) == ([], [])